@@ -0,0 +1,206 @@
+''' BENCHMARKS
+Times the hot paths of stem_the_tide.py (shadow masks, barrier moves, full floods, drawing a frame)
+over a range of grid sizes, barrier counts and tide direction counts, and writes the results as JSON.
+
+Runs headless (SDL dummy video driver). Compare two commits with:
+  python benchmarks/bench_stem_the_tide.py -o before.json
+  python benchmarks/bench_stem_the_tide.py -o after.json
+'''
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')  # Headless pygame
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+os.environ.setdefault('STEM_THE_TIDE_CACHE', '')  # Build every level: measure the code, and keep scaled levels out of the cache
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import numpy as np
+import pygame
+import stem_the_tide as stt
+
+SIDES = ['top', 'left', 'bottom', 'right']
+
+def measure(fn, repeat=5, number=1):
+    """Run fn number times per repeat; return min/median/mean seconds per call"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - start) / number)
+    return {'min': min(times), 'median': statistics.median(times), 'mean': statistics.fmean(times),
+            'repeat': repeat, 'number': number}
+
+def random_barriers(size, count, rng):
+    """count barriers (mixed strong/weak) at random positions inside the metadata zone of a size x size grid"""
+    scale = max(1, size // stt.GRID_W)
+    barriers = []
+    for i in range(count):
+        width, height = rng.randint(4, 16) * scale, 3 * scale
+        x = rng.randint(3, size - 3 - width)
+        y = rng.randint(3, size - 3 - height)
+        barriers.append((x, y, width, height, i % 2 == 1, False))
+    return barriers
+
+def scaled_level(level, size, directions):
+    """A built-in level stretched to a size x size grid, with the tide coming from the first directions sides"""
+    scale = size // stt.GRID_W
+    return {
+        'width': size, 'height': size,
+        'intro': level['intro'],
+        'tide': SIDES[:directions],
+        'priority_zones': [[v * scale for v in zone] for zone in level['priority_zones']],
+        'barriers': [[x * scale, y * scale, w * scale, h * scale, is_weak]
+                     for x, y, w, h, is_weak in level['barriers']],
+        'splash_pads': [[v * scale for v in pad] for pad in level.get('splash_pads', [])],
+    }
+
+def bench_shadow_mask(size, barriers, directions, repeat):
+    """create_flood_shadow_mask_with_weak_barriers for every tide side"""
+    layout = random_barriers(size, barriers, random.Random(size * 1000 + barriers))
+    shape = (size, size)
+
+    def run():
+        for side in SIDES[:directions]:
+            stt.create_flood_shadow_mask_with_weak_barriers(layout, shape, side)
+
+    return dict(measure(run, repeat, number=max(1, 2048 // size)), backend='Grid')
+
+def bench_move_cycle(size, barriers, repeat):
+    """is_valid_position + remove_barrier + place_barrier moving every barrier one cell right and back"""
+    grid = stt.Grid(size, size)
+    stt.setup_metadata_edges(grid, 1, 3)
+    layout = random_barriers(size, barriers, random.Random(size * 1000 + barriers))
+    for x, y, width, height, is_weak, is_active in layout:
+        stt.place_barrier(grid, x, y, width, height, 11 if is_weak else 3)
+
+    def move(x, y, width, height, state, dx):
+        if stt.is_valid_position(grid, x + dx, y, width, height):
+            stt.remove_barrier(grid, x, y, width, height)
+            stt.place_barrier(grid, x + dx, y, width, height, state)
+            return x + dx
+        return x
+
+    def run():
+        for x, y, width, height, is_weak, is_active in layout:
+            state = 12 if is_weak else 4
+            moved = move(x, y, width, height, state, 1)
+            move(moved, y, width, height, state, x - moved)
+
+    return dict(measure(run, repeat, number=max(1, 256 // size)), backend='Grid')
+
+def bench_flood(level_number, size, directions, repeat):
+    """A full flood of a built-in level, from the start of the flood to the win or loss, on the grid backend
+    the Simulation picks for the size (ChunkedGrid above LARGE_BOARD_CELLS)"""
+    level = scaled_level(stt.LEVELS[level_number - 1], size, directions)
+    sim = stt.Simulation(levels=[level])
+    results = []
+
+    def run():
+        sim.reset()
+        results.append(sim.run_to_completion())
+
+    stats = measure(run, repeat)
+    stats['dry'] = results[-1]
+    stats['backend'] = type(sim.grid).__name__
+    return stats
+
+def bench_draw_frame(size, repeat):
+    """One frame of the main() loop mid-flood (flood tick + dirty redraw), and a full redraw, drawing the
+    grid's region like main() does on the backend the Simulation picks for the size"""
+    pixel_size = max(1, 1024 // size)
+    screen = pygame.display.set_mode((size * pixel_size, size * pixel_size))
+    renderer = stt.Renderer(screen, size, size, pixel_size)
+    sim = stt.Simulation(levels=[scaled_level(stt.LEVELS[0], size, 1)])
+
+    def frame():
+        if not sim.flood_active:
+            sim.reset()
+            sim.start_flood()
+        sim.step()
+        renderer.draw(sim.grid.region(0, 0, size, size), stt.DRAW_GRID)
+
+    def full_redraw():
+        renderer.invalidate()
+        renderer.draw(sim.grid.region(0, 0, size, size), stt.DRAW_GRID)
+
+    return {'frame': measure(frame, repeat, number=8), 'full_redraw': measure(full_redraw, repeat, number=4),
+            'backend': type(sim.grid).__name__}
+
+def git_commit():
+    """Current commit of the repo, if it is a git checkout"""
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO_ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmarks(sizes, barrier_counts, direction_counts, repeat, log=print):
+    """Run every benchmark over the parameter grid; return a list of result records"""
+    results = []
+
+    def record(name, params, stats):
+        results.append({'name': name, 'params': params, **stats})
+        median = stats['median'] if 'median' in stats else stats['frame']['median']
+        log(f"{name:<12} {json.dumps(params):<50} {stats['backend']:<12} {median * 1000:10.3f} ms")
+
+    for size in sizes:
+        for barriers in barrier_counts:
+            for directions in direction_counts:
+                record('shadow_mask', {'size': size, 'barriers': barriers, 'directions': directions},
+                       bench_shadow_mask(size, barriers, directions, repeat))
+            record('move_cycle', {'size': size, 'barriers': barriers}, bench_move_cycle(size, barriers, repeat))
+        for level_number in (1, 2):
+            for directions in direction_counts:
+                record('flood', {'level': level_number, 'size': size, 'directions': directions},
+                       bench_flood(level_number, size, directions, repeat))
+        record('draw_frame', {'size': size}, bench_draw_frame(size, repeat))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Stem the Tide hot paths")
+    parser.add_argument('-o', '--output', help="JSON file to write (default: stdout)")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[64, 128, 256, 512, 1024])
+    parser.add_argument('--barriers', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--directions', type=int, nargs='+', default=[1, 2, 4], choices=range(1, 5))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--quick', action='store_true', help="Small sizes and few repeats, as a smoke test")
+    args = parser.parse_args()
+    if args.quick:
+        args.sizes, args.repeat = [64, 128], 2
+    for size in args.sizes:
+        if size < stt.GRID_W or size % stt.GRID_W:
+            parser.error(f"grid sizes must be multiples of {stt.GRID_W}")
+
+    pygame.display.init()
+    log = (lambda line: print(line, file=sys.stderr))
+    results = run_benchmarks(args.sizes, args.barriers, args.directions, args.repeat, log)
+    pygame.quit()
+
+    report = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pygame': pygame.version.ver,
+        'machine': platform.machine(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -41,8 +41,34 @@ Mechanic 3: Splash Pads
 - Level 5: Tide comes in from 3 directions. 2 Splash Pads make it difficult to track where the water will come from when it nears the dray zones. Must place barriers to block both incoming tides and splashed water.
 '''
 
+import argparse
+import base64
+import collections
+import concurrent.futures
+import contextlib
+import functools
+import hashlib
+import json
+import mmap
+import os
+import struct
 import sys
-import pygame
+import time
+import zlib
+
+try:
+    import numpy as np
+except ImportError:  # Optional: without NumPy the game runs on the bitboard backend (BitGrid)
+    np = None
+
+pygame = None  # Imported by the rendering front end only (load_pygame), so tools using just the game logic skip it
+
+def load_pygame():
+    """Import pygame for the rendering front end (once)"""
+    global pygame
+    if pygame is None:
+        import pygame
+    return pygame
 
 # ---------- Config ----------
 GRID_W, GRID_H = 64, 64      # 64x64 "pixels"
@@ -64,8 +90,9 @@ STATES = {
     10: (255, 0, 0),      # Wet Priority (red) - game over state
     11: (139, 69, 19),    # Weak Barrier (brown) - inactive
     12: (0, 255, 0),      # Weak Barrier (green) - active/movable
+    13: (0, 255, 255),    # Splash Pad (cyan) - bounces the tide sideways
     # Future states can be added here:
-    # 13-15: Available for future features
+    # 14-15: Available for future features
 }
 
 # Flood direction system (for future levels)
@@ -77,8 +104,33 @@ FLOOD_DIRECTIONS = {
     'multi': [(0, 1), (1, 0)]  # Multiple directions
 }
 
+# Boards bigger than this window scroll and zoom inside it
+MAX_WIN_W, MAX_WIN_H = 1280, 800
+ZOOM_LEVELS = (1, 2, 3, 5, 10, 20)  # Pixels per cell
+
+# Built initial state of each level (grid, shadow counts, colors) cached across runs, keyed by a hash
+# of the level definition (set STEM_THE_TIDE_CACHE to an empty string to turn it off)
+LEVEL_CACHE_DIR = os.environ.get('STEM_THE_TIDE_CACHE',
+                                 os.path.join(os.path.expanduser('~'), '.cache', 'stem_the_tide'))
+LEVEL_CACHE_VERSION = 3  # Bump when the way levels are built (or the file layout) changes
+LEVEL_CACHE_MAX_BYTES = 64 * 1024 * 1024  # Oldest files are removed beyond this
+
 GRID_COLOR = (40, 40, 40)
-DRAW_GRID = False  # set True to see grid lines (slower)
+DRAW_GRID = False  # set True to see grid lines
+
+# Placement hints (h): tint of each position the selected barrier can go, by the priority zones it keeps dry
+HINT_DRY, HINT_SOME, HINT_WET = (0, 255, 0), (255, 255, 0), (255, 0, 0)  # Every zone / some / none
+HINT_ALPHA = 96
+
+# Flood time scales stepped through with , and . (INSTANT runs the rest of the flood in one frame)
+INSTANT = float('inf')
+TIME_SCALES = (1, 2, 5, 10, 50, INSTANT)
+
+# Color lookup table indexed by state (magenta for unknown states)
+if np is not None:
+    PALETTE = np.full((256, 3), (255, 0, 255), dtype=np.uint8)
+    for _state, _color in STATES.items():
+        PALETTE[_state] = _color
 
 def clamp(v, lo, hi):
     return max(lo, min(hi, v))
@@ -87,450 +139,2845 @@ def get_color_for_state(state):
     """Get the color for a given state number"""
     return STATES.get(state, (255, 0, 255))  # Magenta for unknown states
 
+class Grid:
+    """Grid of cell states backed by a compact uint8 NumPy array (indexed [y, x])"""
+
+    def __init__(self, width=GRID_W, height=GRID_H):
+        self.width = width
+        self.height = height
+        self.cells = np.zeros((height, width), dtype=np.uint8)
+
+    def __getitem__(self, y):
+        # Rows are views into the array, so grid[y][x] reads and writes still work
+        return self.cells[y]
+
+    def __len__(self):
+        return self.height
+
+    @property
+    def shape(self):
+        return self.cells.shape
+
+    def clear(self):
+        """Set every cell back to empty"""
+        self.cells.fill(0)
+
+    def state_bytes(self):
+        """Cell states, one byte per cell, row by row"""
+        return self.cells.tobytes()
+
+    def region(self, x, y, width, height):
+        """Cell states of a rectangle (clipped to the grid), as a view into the array"""
+        return self.cells[max(0, y):max(0, y + height), max(0, x):max(0, x + width)]
+
+    def snapshot(self):
+        """Read-only copy of the cells, for restore()"""
+        cells = self.cells.copy()
+        cells.setflags(write=False)
+        return cells
+
+    def restore(self, snapshot):
+        """Set the cells back to a snapshot()"""
+        self.cells[:] = snapshot
+
+    def shadow_coverage(self, barriers, direction='top'):
+        """Shadow coverage of barriers facing a tide from the given side, for this backend"""
+        return ShadowCoverage(barriers, self.cells.shape, direction)
+
+    def splash_waves(self, splash_pads, margin=3):
+        """Splash wavefronts for this backend"""
+        return SplashWaves(self, splash_pads, margin)
+
+    def fill_rect(self, x, y, width, height, state):
+        """Set every cell of a rectangle to the given state"""
+        self.cells[y:y + height, x:x + width] = state
+
+    def is_valid_position(self, x, y, width, height):
+        """Check if a position is valid (within bounds and not overlapping priority areas)"""
+        if x < 0 or y < 0 or x + width > self.width or y + height > self.height:
+            return False
+        # Only allow empty and barriers (lookup table instead of a per-cell membership test)
+        return bool(PASSABLE_STATES[self.cells[y:y + height, x:x + width]].all())
+
+    def place_barrier(self, x, y, width, height, state):
+        """Place a barrier at the given position"""
+        self.fill_rect(x, y, width, height, state)
+
+    def remove_barrier(self, x, y, width, height):
+        """Remove a barrier from the given position (set to empty)"""
+        self.fill_rect(x, y, width, height, 0)
+
+    def setup_metadata_edges(self, current_level, total_levels=8):
+        """Setup the metadata edges with level progression indicators"""
+        cells = self.cells
+        cells[:3, :] = 6   # Metadata zone
+        cells[-3:, :] = 6
+        cells[:, :3] = 6
+        cells[:, -3:] = 6
+
+        # Level progression indicators (top edge, centered), one empty metadata block between each
+        level_start_x = self.width // 2 - (total_levels * 2 - 1) // 2
+        levels = np.arange(total_levels)
+        xs = level_start_x + levels * 2
+        inside = (xs >= 3) & (xs < self.width - 3)
+        states = np.where(levels < current_level - 1, 7,              # Passed level (green)
+                          np.where(levels == current_level - 1, 8, 9))  # Current (yellow) / future (red)
+        cells[1, xs[inside]] = states[inside]
+
+    def band(self, direction, index, margin=3):
+        """Slices of the row (tide from top/bottom) or column (left/right) at index, inside the metadata zone"""
+        dx, dy = FLOOD_DIRECTIONS[direction]
+        if dx == 0:
+            return index, slice(margin, self.width - margin)
+        return slice(margin, self.height - margin), index
+
+    def mark_tide_source(self, direction, margin=3):
+        """Make the edge row or column the tide comes from tide (but not in metadata zone)"""
+        dx, dy = FLOOD_DIRECTIONS[direction]
+        edge = 0 if dx + dy > 0 else (self.height if dx == 0 else self.width) - 1
+        self.cells[self.band(direction, edge, margin)] = 2  # State 2 = tide (blue)
+
+    def flood_band(self, direction, index, shadow, margin=3):
+        """Flood the empty and priority cells of one band that are not shadowed (boolean mask or shadow counts)"""
+        band = self.band(direction, index, margin)
+        cells = self.cells[band]  # Don't flood metadata zone
+        cells[FLOODABLE_STATES[cells] & (shadow[band] == 0)] = 2  # State 2 = tide
+
+    def check_priority_wet(self, priority_zones):
+        """Check if any priority zone has been touched by the tide"""
+        for zone_x, zone_y, zone_size in priority_zones:
+            if (self.cells[zone_y:zone_y + zone_size, zone_x:zone_x + zone_size] == 2).any():  # Tide
+                return True
+        return False
+
+    def mark_priority_wet(self, priority_zones):
+        """Mark all priority zones as wet (game over state)"""
+        for zone_x, zone_y, zone_size in priority_zones:
+            self.fill_rect(zone_x, zone_y, zone_size, zone_size, 10)  # Wet priority (red)
+
+# States a barrier may be moved over: empty and (strong) barriers
+PASSABLE = (0, 3, 4)
+
+# States the tide can enter: empty and priority (a priority cell taking the tide is how a zone gets wet)
+FLOODABLE = (0, 1)
+
+if np is not None:
+    # Lookup tables of the above, indexed by state
+    PASSABLE_STATES = np.zeros(256, dtype=bool)
+    PASSABLE_STATES[list(PASSABLE)] = True
+    FLOODABLE_STATES = np.zeros(256, dtype=bool)
+    FLOODABLE_STATES[list(FLOODABLE)] = True
+
 def is_valid_position(grid, x, y, width, height):
     """Check if a position is valid (within bounds and not overlapping priority areas)"""
-    if x < 0 or y < 0 or x + width > GRID_W or y + height > GRID_H:
-        return False
-    
-    # Check if the area is empty or contains the barrier itself
-    for dy in range(height):
-        for dx in range(width):
-            if grid[y + dy][x + dx] not in [0, 3, 4]:  # Only allow empty and barriers
-                return False
-    return True
+    return grid.is_valid_position(x, y, width, height)
 
 def place_barrier(grid, x, y, width, height, state):
     """Place a barrier at the given position"""
-    for dy in range(height):
-        for dx in range(width):
-            grid[y + dy][x + dx] = state
+    grid.place_barrier(x, y, width, height, state)
 
 def remove_barrier(grid, x, y, width, height):
     """Remove a barrier from the given position (set to empty)"""
-    for dy in range(height):
-        for dx in range(width):
-            grid[y + dy][x + dx] = 0
+    grid.remove_barrier(x, y, width, height)
+
+@functools.lru_cache(maxsize=None)
+def shadow_footprint(width, height, is_weak):
+    """Shadow cast by a barrier, as a boolean array whose first row lies just below the barrier.
+
+    Computed once per (width, height, is_weak) and cached; callers stamp it at the barrier's
+    offset, so the array is read-only.
+    """
+    # Enough rows for the shadow to shrink away completely, trimmed to the rows that have any
+    distances = np.arange(height, height + 2 * width + 2)[:, None]
+    if is_weak:
+        # Weak barriers: shadow shrinks by 2 pixels every row (1 pixel per side)
+        shadow_shrink = np.maximum(0, distances - 1)
+    else:
+        # Strong barriers: shadow shrinks by 2 pixels every 2 rows
+        shadow_shrink = np.maximum(0, (distances - 1) // 2)
+    shadow_width = np.maximum(0, width - shadow_shrink * 2)
+
+    # Shadow stays centered behind the barrier
+    shadow_start = (width - shadow_width) // 2
+    cols = np.arange(width)[None, :]
+    footprint = (cols >= shadow_start) & (cols < shadow_start + shadow_width)
+    footprint = footprint[:int((shadow_width > 0).sum())]
+    footprint.setflags(write=False)
+    return footprint
+
+@functools.lru_cache(maxsize=None)
+def oriented_footprint(width, height, is_weak, direction='top'):
+    """Shadow of a barrier facing a tide from the given side, in grid orientation, and its (row, col) offset.
+
+    The shadow lies on the far side of the barrier from the tide, so a tide from the left
+    casts it to the right of the barrier, measured along the barrier's width.
+    """
+    dx, dy = FLOOD_DIRECTIONS[direction]
+    if dx == 0:
+        footprint = shadow_footprint(width, height, is_weak)
+    else:
+        # Along the flow is the barrier's width, across it the height
+        footprint = shadow_footprint(height, width, is_weak).T
+    if dy > 0:
+        offset = (height, 0)
+    elif dy < 0:
+        footprint, offset = footprint[::-1], (-footprint.shape[0], 0)
+    elif dx > 0:
+        offset = (0, width)
+    else:
+        footprint, offset = footprint[:, ::-1], (0, -footprint.shape[1])
+    footprint = np.ascontiguousarray(footprint)
+    footprint.setflags(write=False)
+    return footprint, offset
 
-def create_flood_shadow_mask(barriers):
+def shadow_window(shape, x, y, width, height, is_weak, direction='top'):
+    """Slices of a (height, width) mask covered by a barrier's shadow, and the footprint clipped to them"""
+    footprint, (offset_y, offset_x) = oriented_footprint(width, height, is_weak, direction)
+    grid_h, grid_w = shape
+    top, left = y + offset_y, x + offset_x
+    first_row, last_row = max(0, top), min(grid_h, top + footprint.shape[0])
+    first_col, last_col = max(0, left), min(grid_w, left + footprint.shape[1])
+    if first_row >= last_row or first_col >= last_col:
+        return None
+    return ((slice(first_row, last_row), slice(first_col, last_col)),
+            footprint[first_row - top:last_row - top, first_col - left:last_col - left])
+
+def stamp_shadow(shadow_mask, x, y, width, height, is_weak, direction='top'):
+    """OR a barrier's cached shadow footprint into a boolean mask at the barrier's offset"""
+    window = shadow_window(shadow_mask.shape, x, y, width, height, is_weak, direction)
+    if window is not None:
+        region, footprint = window
+        shadow_mask[region] |= footprint
+
+class ShadowCoverage:
+    """Per-cell count of the barrier shadows covering each cell, updated one barrier at a time.
+
+    Moving a barrier subtracts its old footprint and adds its new one, so the cost of a move
+    depends on the size of one shadow and overlapping shadows of other barriers stay intact.
+    """
+
+    def __init__(self, barriers=(), shape=(GRID_H, GRID_W), direction='top', counts=None):
+        self.direction = direction  # Side the tide comes from
+        # Start from a copy of given counts (e.g. a level's cached ones) or from no shadows
+        self.counts = np.zeros(shape, dtype=np.uint16) if counts is None else counts.copy()
+        for barrier in barriers:
+            self.add(barrier)
+
+    def _apply(self, barrier, add):
+        barrier_x, barrier_y, barrier_width, barrier_height, is_weak = barrier[:5]
+        window = shadow_window(self.counts.shape, barrier_x, barrier_y, barrier_width, barrier_height, is_weak,
+                               self.direction)
+        if window is not None:
+            region, footprint = window
+            if add:
+                self.counts[region] += footprint
+            else:
+                self.counts[region] -= footprint
+
+    def add(self, barrier):
+        """Add a barrier's shadow (barrier tuple as stored in the barriers list)"""
+        self._apply(barrier, True)
+
+    def remove(self, barrier):
+        """Remove a barrier's shadow that was previously added"""
+        self._apply(barrier, False)
+
+    def move(self, old_barrier, new_barrier):
+        """Replace a barrier's shadow at its old position with the one at its new position"""
+        self.remove(old_barrier)
+        self.add(new_barrier)
+
+    @property
+    def mask(self):
+        """Boolean mask of cells covered by at least one shadow"""
+        return self.counts > 0
+
+def create_flood_shadow_mask(barriers, shape=(GRID_H, GRID_W)):
     """Create a mask of cells that should be excluded from flooding (shadow areas)"""
-    shadow_mask = set()
-    
-    for barrier in barriers:
-        barrier_x, barrier_y, barrier_width, barrier_height = barrier
-        
-        # For each row below the barrier
-        for row in range(barrier_y + barrier_height, GRID_H):
-            # Calculate distance from barrier
-            distance_from_barrier = row - barrier_y
-            
-            # Calculate shadow width - starts at barrier width, shrinks by 2 pixels every 2 rows
-            # Every 2 rows, the shadow gets 1 pixel smaller on each side
-            shadow_shrink = max(0, (distance_from_barrier - 1) // 2)
-            shadow_width = max(0, barrier_width - (shadow_shrink * 2))
-            
-            if shadow_width > 0:
-                # Calculate shadow position (centered behind barrier)
-                shadow_start = barrier_x + (barrier_width - shadow_width) // 2
-                shadow_end = shadow_start + shadow_width
-                
-                # Add shadow cells to mask
-                for col in range(shadow_start, shadow_end):
-                    if 0 <= col < GRID_W:
-                        shadow_mask.add((col, row))
-    
+    shadow_mask = np.zeros(shape, dtype=bool)
+    for barrier_x, barrier_y, barrier_width, barrier_height in barriers:
+        stamp_shadow(shadow_mask, barrier_x, barrier_y, barrier_width, barrier_height, False)
     return shadow_mask
 
-def create_flood_shadow_mask_with_weak_barriers(barriers):
+def create_flood_shadow_mask_with_weak_barriers(barriers, shape=(GRID_H, GRID_W), direction='top'):
     """Create a mask of cells that should be excluded from flooding (shadow areas)"""
-    shadow_mask = set()
-    
-    for barrier in barriers:
-        barrier_x, barrier_y, barrier_width, barrier_height, is_weak, is_active = barrier
-        
-        # For each row below the barrier
-        for row in range(barrier_y + barrier_height, GRID_H):
-            # Calculate distance from barrier
-            distance_from_barrier = row - barrier_y
-            
-            # Calculate shadow width based on barrier type
-            if is_weak:
-                # Weak barriers: shadow shrinks by 2 pixels every row (1 pixel per side)
-                # First row: full width, second row: width-2, third row: width-4, etc.
-                shadow_shrink = max(0, distance_from_barrier - 1)  # Start shrinking from second row
-                shadow_width = max(0, barrier_width - (shadow_shrink * 2))
-            else:
-                # Strong barriers: shadow shrinks by 2 pixels every 2 rows
-                shadow_shrink = max(0, (distance_from_barrier - 1) // 2)
-                shadow_width = max(0, barrier_width - (shadow_shrink * 2))
-            
-            if shadow_width > 0:
-                # Calculate shadow position (centered behind barrier)
-                shadow_start = barrier_x + (barrier_width - shadow_width) // 2
-                shadow_end = shadow_start + shadow_width
-                
-                # Add shadow cells to mask
-                for col in range(shadow_start, shadow_end):
-                    if 0 <= col < GRID_W:
-                        shadow_mask.add((col, row))
-    
+    shadow_mask = np.zeros(shape, dtype=bool)
+    for barrier_x, barrier_y, barrier_width, barrier_height, is_weak, is_active in barriers:
+        stamp_shadow(shadow_mask, barrier_x, barrier_y, barrier_width, barrier_height, is_weak, direction)
     return shadow_mask
 
+def resolve_tide_sources(sources):
+    """Expand tide sources (FLOOD_DIRECTIONS names, including 'multi') to a tuple of sides"""
+    sides = {vector: side for side, vector in FLOOD_DIRECTIONS.items() if isinstance(vector, tuple)}
+    resolved = []
+    for source in sources:
+        vectors = FLOOD_DIRECTIONS[source]
+        for vector in (vectors if isinstance(vectors, list) else [vectors]):
+            if sides[vector] not in resolved:
+                resolved.append(sides[vector])
+    return tuple(resolved)
+
+def flood_band_index(shape, direction, tick):
+    """Row or column a tide from the given side floods on a tick (the source edge is tick 0)"""
+    dx, dy = FLOOD_DIRECTIONS[direction]
+    length = shape[0] if dx == 0 else shape[1]
+    return tick if dx + dy > 0 else length - 1 - tick
+
+def flood_arrival_ticks(shape, direction):
+    """Tick on which a tide from the given side reaches each cell, broadcastable to the grid shape"""
+    dx, dy = FLOOD_DIRECTIONS[direction]
+    if dx == 0:
+        ticks = np.arange(shape[0])[:, None]
+    else:
+        ticks = np.arange(shape[1])[None, :]
+    return ticks if dx + dy > 0 else ticks[::-1] if dx == 0 else ticks[:, ::-1]
+
+def perpendicular_sides(direction):
+    """Sides a splash pad sends the tide from when it is hit by a tide from the given side"""
+    return ('left', 'right') if FLOOD_DIRECTIONS[direction][0] == 0 else ('top', 'bottom')
+
+class SplashWaves:
+    """Wavefronts bounced off splash pads, fed by a deduplicated work queue of pad hits.
+
+    A pad hit by a tide from one side sends a front out of each perpendicular side, as wide as
+    the pad. Fronts are kept as the head cells of their lanes, batched per direction, so a tick
+    costs a few array operations per direction plus the cells the heads enter. A lane stops at
+    anything the tide cannot enter, and a lane reaching another pad hits that pad. Each pad sends
+    a front in each direction at most once, and a lane entering a cell that a lane moving the
+    same way already entered is dropped, so chains and loops of pads cannot multiply the work.
+    """
+
+    def __init__(self, grid, splash_pads, margin=3, write=True):
+        self.grid = grid
+        self.splash_pads = list(splash_pads)  # List of (x, y, size)
+        self.margin = margin
+        self.write = write  # Flood the cells (False only records arrival ticks)
+        self.pad_ids = np.full(grid.cells.shape, -1, dtype=np.int16)
+        for pad, (pad_x, pad_y, pad_size) in enumerate(self.splash_pads):
+            self.pad_ids[pad_y:pad_y + pad_size, pad_x:pad_x + pad_size] = pad
+        self.spawned = set()  # (pad, side) fronts already sent
+        self.queue = collections.deque()  # Pending (pad, side) fronts
+        self.fronts = {}  # Side -> (rows, cols) of the lane heads moving away from that side
+        self.visited = {}  # Side -> cells a lane moving that way has entered
+
+    @property
+    def active(self):
+        return bool(self.queue) or any(len(rows) for rows, cols in self.fronts.values())
+
+    def hit(self, pad, direction):
+        """Queue the fronts a pad sends when a tide from the given side reaches it"""
+        for side in perpendicular_sides(direction):
+            if (pad, side) not in self.spawned:
+                self.spawned.add((pad, side))
+                self.queue.append((pad, side))
+
+    def hit_band(self, direction, band, shadow):
+        """Hit the pads in a band a main tide front just reached, unless they are in its shadow"""
+        ids = self.pad_ids[band]
+        if ids.max(initial=-1) >= 0:
+            for pad in np.unique(ids[(ids >= 0) & (shadow[band] == 0)]).tolist():
+                self.hit(pad, direction)
+
+    def step(self, tick, arrival=None):
+        """Advance every lane by one cell, then start the queued fronts (they move from the next tick)"""
+        cells = self.grid.cells
+        height, width = cells.shape
+        margin = self.margin
+        for side, (rows, cols) in self.fronts.items():
+            if not len(rows):
+                continue
+            dx, dy = FLOOD_DIRECTIONS[side]
+            rows, cols = rows + dy, cols + dx
+
+            # Drop lanes leaving the playable area, or entering a cell a lane moving the same way already took
+            keep = (rows >= margin) & (rows < height - margin) & (cols >= margin) & (cols < width - margin)
+            visited = self.visited.get(side)
+            if visited is None:
+                visited = self.visited[side] = np.zeros(cells.shape, dtype=bool)
+            keep[keep] = ~visited[rows[keep], cols[keep]]
+            rows, cols = rows[keep], cols[keep]
+            visited[rows, cols] = True
+
+            states = cells[rows, cols]
+            floods = FLOODABLE_STATES[states]
+            flooded_rows, flooded_cols = rows[floods], cols[floods]
+            if arrival is not None:
+                arrival[flooded_rows, flooded_cols] = np.minimum(arrival[flooded_rows, flooded_cols], tick)
+            if self.write:
+                cells[flooded_rows, flooded_cols] = 2  # State 2 = tide
+
+            pads = self.pad_ids[rows, cols]
+            if pads.max(initial=-1) >= 0:
+                for pad in np.unique(pads[pads >= 0]).tolist():
+                    self.hit(pad, side)
+            # Lanes go on through water, stop at pads and anything else the tide cannot enter
+            moving = floods | (states == 2)
+            self.fronts[side] = (rows[moving], cols[moving])
+
+        while self.queue:
+            pad, side = self.queue.popleft()
+            pad_x, pad_y, pad_size = self.splash_pads[pad]
+            dx, dy = FLOOD_DIRECTIONS[side]
+            # Lanes start on the pad's far edge
+            lanes = np.arange(pad_size)
+            if dx == 0:
+                rows = np.full(pad_size, pad_y + pad_size - 1 if dy > 0 else pad_y)
+                cols = pad_x + lanes
+            else:
+                rows = pad_y + lanes
+                cols = np.full(pad_size, pad_x + pad_size - 1 if dx > 0 else pad_x)
+            if side in self.fronts:
+                rows = np.concatenate([self.fronts[side][0], rows])
+                cols = np.concatenate([self.fronts[side][1], cols])
+            self.fronts[side] = (rows, cols)
+
+class FloodEngine:
+    """Tides from any combination of sides, each front flooding one band (row or column) per tick.
+
+    Only the bands at the wavefronts are touched on a tick, and a front is dropped from the
+    active set once it has crossed the board. Splash pads reached by a front send SplashWaves.
+    """
+
+    def __init__(self, grid, shadows, splash_pads=(), tick=0, margin=3):
+        self.grid = grid
+        self.shadows = shadows  # Side -> ShadowCoverage (or boolean mask) for that side's tide
+        self.tick = tick
+        self.margin = margin
+        self.active = list(shadows)
+        self.splash = grid.splash_waves(splash_pads, margin) if splash_pads else None
+
+    def step(self):
+        """Advance every active front by one band; return False once every front has crossed the board"""
+        self.tick += 1
+        grid, margin = self.grid, self.margin
+        for direction in list(self.active):
+            length = grid.height if FLOOD_DIRECTIONS[direction][0] == 0 else grid.width
+            if self.tick >= length - margin:
+                # Front has crossed the playable area
+                self.active.remove(direction)
+            elif self.tick >= margin:  # Don't flood metadata zone
+                index = flood_band_index(grid.shape, direction, self.tick)
+                shadow = self.shadows[direction]
+                shadow = getattr(shadow, 'counts', shadow)
+                grid.flood_band(direction, index, shadow, margin)
+                if self.splash is not None:
+                    self.splash.hit_band(direction, grid.band(direction, index, margin), shadow)
+        if self.splash is not None:
+            self.splash.step(self.tick)
+            return bool(self.active) or self.splash.active
+        return bool(self.active)
+
+def splash_arrival_ticks(grid, splash_pads, triggers, margin=3):
+    """Tick on which splash fronts first wet each cell (int32 max if never), without changing the grid.
+
+    triggers maps a tick to the (pad, side) hits of main tide fronts on that tick.
+    """
+    triggers = dict(triggers)
+    splash = SplashWaves(grid, splash_pads, margin, write=False)
+    arrival = np.full(grid.cells.shape, np.iinfo(np.int32).max, dtype=np.int32)
+    tick = 0
+    while triggers or splash.active:
+        tick += 1
+        for pad, side in triggers.pop(tick, ()):
+            splash.hit(pad, side)
+        splash.step(tick, arrival)
+    return arrival
+
+FloodPrediction = collections.namedtuple('FloodPrediction', ['tide', 'zone_wet', 'first_wet_tick', 'safe'])
+
+def predict_flood(grid, barriers, priority_zones, sources=('top',), tick=0, shadows=None, splash_pads=(), margin=3):
+    """Compute the outcome of a flood in one vectorized pass instead of animating it tick by tick.
+
+    Returns a FloodPrediction with the tide mask of the grid after every front has crossed it,
+    whether each priority zone gets wet, the first flood tick on which each zone gets wet (for
+    a tide from the top this is the row; None if it stays dry) and whether every zone stays
+    dry. tick is the number of ticks already run, as in FloodEngine.
+
+    Splash fronts are replayed from the start of the flood with the current layout, which only
+    touches the cells they reach.
+    """
+    if shadows is None:
+        shadows = {side: create_flood_shadow_mask_with_weak_barriers(barriers, grid.cells.shape, side)
+                   for side in sources}
+    cells = grid.cells
+    floodable = FLOODABLE_STATES[cells]
+
+    # Earliest tick on which any front reaches each floodable, unshadowed cell
+    never = np.iinfo(np.int32).max
+    arrival = np.full(cells.shape, never, dtype=np.int32)
+    for side in sources:
+        ticks = flood_arrival_ticks(cells.shape, side)
+        reach = floodable & (shadows[side] == 0) & (ticks > tick)
+        np.minimum(arrival, np.where(reach, ticks, never), out=arrival)
+    # Don't flood metadata zone
+    arrival[:margin] = never
+    arrival[grid.height - margin:] = never
+    arrival[:, :margin] = never
+    arrival[:, grid.width - margin:] = never
+
+    if splash_pads:
+        # Tick on which each main front first reaches each pad outside its shadow
+        triggers = {}
+        for side in sources:
+            ticks = np.broadcast_to(flood_arrival_ticks(cells.shape, side), cells.shape)
+            for pad, (pad_x, pad_y, pad_size) in enumerate(splash_pads):
+                region = (slice(pad_y, pad_y + pad_size), slice(pad_x, pad_x + pad_size))
+                reached = ticks[region][shadows[side][region] == 0]
+                if len(reached):
+                    triggers.setdefault(int(reached.min()), []).append((pad, side))
+
+        splash_arrival = splash_arrival_ticks(grid, splash_pads, triggers, margin)
+        splash_arrival[splash_arrival <= tick] = never
+        np.minimum(arrival, splash_arrival, out=arrival)
+
+    zone_wet = []
+    first_wet_tick = []
+    for zone_x, zone_y, zone_size in priority_zones:
+        first = int(arrival[zone_y:zone_y + zone_size, zone_x:zone_x + zone_size].min())
+        zone_wet.append(first != never)
+        first_wet_tick.append(first if first != never else None)
+
+    return FloodPrediction((arrival != never) | (cells == 2), zone_wet, first_wet_tick, not any(zone_wet))
+
+# ---------- Bitboard backend (no NumPy) ----------
+
+@functools.lru_cache(maxsize=None)
+def shadow_spans(width, height, is_weak):
+    """(start, width) of each row of a barrier's shadow, from the row just below the barrier (no NumPy)"""
+    spans = []
+    for distance in range(height, height + 2 * width + 2):
+        if is_weak:
+            # Weak barriers: shadow shrinks by 2 pixels every row (1 pixel per side)
+            shadow_shrink = max(0, distance - 1)
+        else:
+            # Strong barriers: shadow shrinks by 2 pixels every 2 rows
+            shadow_shrink = max(0, (distance - 1) // 2)
+        shadow_width = max(0, width - shadow_shrink * 2)
+        if not shadow_width:
+            break
+        # Shadow stays centered behind the barrier
+        spans.append(((width - shadow_width) // 2, shadow_width))
+    return tuple(spans)
+
+@functools.lru_cache(maxsize=4096)
+def bit_shadow_rows(shape, x, y, width, height, is_weak, direction='top'):
+    """A barrier's shadow facing a tide from the given side, as {row: bitmask} clipped to the grid"""
+    grid_h, grid_w = shape
+    dx, dy = FLOOD_DIRECTIONS[direction]
+    rows = {}
+    if dx == 0:
+        for distance, (start, span) in enumerate(shadow_spans(width, height, is_weak)):
+            row = y + height + distance if dy > 0 else y - 1 - distance
+            if 0 <= row < grid_h:
+                rows[row] = ((1 << span) - 1) << (x + start)
+    else:
+        # Along the flow is the barrier's width, across it the height
+        for distance, (start, span) in enumerate(shadow_spans(height, width, is_weak)):
+            col = x + width + distance if dx > 0 else x - 1 - distance
+            if 0 <= col < grid_w:
+                for row in range(max(0, y + start), min(grid_h, y + start + span)):
+                    rows[row] = rows.get(row, 0) | 1 << col
+    full = (1 << grid_w) - 1
+    return {row: mask & full for row, mask in rows.items()}
+
+class BitShadowCoverage:
+    """ShadowCoverage for BitGrid: the union of the barrier shadows as one bitmask per row.
+
+    Moving a barrier only recomputes the rows its old and new shadows touch.
+    """
+
+    def __init__(self, barriers=(), shape=(GRID_H, GRID_W), direction='top'):
+        self.direction = direction  # Side the tide comes from
+        self.shape = shape
+        self.rows = [0] * shape[0]
+        self.barriers = collections.Counter()  # (x, y, width, height, is_weak) -> how many barriers are there
+        for barrier in barriers:
+            self.add(barrier)
+
+    def _shadow(self, key):
+        return bit_shadow_rows(self.shape, *key, self.direction)
+
+    def _refresh(self, touched):
+        shadows = [self._shadow(key) for key in self.barriers]
+        for row in touched:
+            mask = 0
+            for shadow in shadows:
+                mask |= shadow.get(row, 0)
+            self.rows[row] = mask
+
+    def add(self, barrier):
+        """Add a barrier's shadow (barrier tuple as stored in the barriers list)"""
+        key = tuple(barrier[:5])
+        self.barriers[key] += 1
+        for row, mask in self._shadow(key).items():
+            self.rows[row] |= mask
+
+    def remove(self, barrier):
+        """Remove a barrier's shadow that was previously added"""
+        key = tuple(barrier[:5])
+        self.barriers[key] -= 1
+        if not self.barriers[key]:
+            del self.barriers[key]
+        self._refresh(self._shadow(key))
+
+    def move(self, old_barrier, new_barrier):
+        """Replace a barrier's shadow at its old position with the one at its new position"""
+        self.remove(old_barrier)
+        self.add(new_barrier)
+
+    @property
+    def mask(self):
+        """Bitmask per row of cells covered by at least one shadow"""
+        return list(self.rows)
+
+def bit_runs(bits):
+    """(start, length) of each run of set bits in an int, lowest bit first"""
+    x = 0
+    while bits:
+        skip = (bits & -bits).bit_length() - 1  # Trailing zeros
+        bits >>= skip
+        x += skip
+        run = (~bits & (bits + 1)).bit_length() - 1  # Trailing ones
+        yield x, run
+        bits >>= run
+        x += run
+
+class BitGrid:
+    """Grid of cell states as bitboards: for each state, one Python int per row with bit x set for column x.
+
+    Needs no NumPy. Empty cells have no bit in any layer, and occupied is the union of every layer,
+    so flooding a band, testing a placement or checking a zone takes a few int operations per row.
+    """
+
+    def __init__(self, width=GRID_W, height=GRID_H):
+        self.width = width
+        self.height = height
+        self.layers = {}  # State -> list of row bitmasks
+        self.occupied = [0] * height  # Row bitmasks of the cells that are not empty
+
+    def __getitem__(self, y):
+        # A copy of the row's states (writes do not reach the grid)
+        return [self.get(x, y) for x in range(self.width)]
+
+    def __len__(self):
+        return self.height
+
+    @property
+    def shape(self):
+        return self.height, self.width
+
+    def layer(self, state):
+        """Row bitmasks of a state (created empty on first use)"""
+        rows = self.layers.get(state)
+        if rows is None:
+            rows = self.layers[state] = [0] * self.height
+        return rows
+
+    def get(self, x, y):
+        """State of one cell"""
+        bit = 1 << x
+        if self.occupied[y] & bit:
+            for state, rows in self.layers.items():
+                if rows[y] & bit:
+                    return state
+        return 0
+
+    def clear(self):
+        """Set every cell back to empty"""
+        self.layers = {}
+        self.occupied = [0] * self.height
+
+    def state_bytes(self):
+        """Cell states, one byte per cell, row by row"""
+        cells = bytearray(self.width * self.height)
+        for state, rows in self.layers.items():
+            for y, bits in enumerate(rows):
+                for x, run in bit_runs(bits):
+                    start = y * self.width + x
+                    cells[start:start + run] = bytes((state,)) * run
+        return bytes(cells)
+
+    def snapshot(self):
+        """Copy of the layers, for restore()"""
+        return {state: tuple(rows) for state, rows in self.layers.items()}, tuple(self.occupied)
+
+    def restore(self, snapshot):
+        """Set the layers back to a snapshot()"""
+        layers, occupied = snapshot
+        self.layers = {state: list(rows) for state, rows in layers.items()}
+        self.occupied = list(occupied)
+
+    def shadow_coverage(self, barriers, direction='top'):
+        """Shadow coverage of barriers facing a tide from the given side, for this backend"""
+        return BitShadowCoverage(barriers, self.shape, direction)
+
+    def splash_waves(self, splash_pads, margin=3):
+        """Splash wavefronts for this backend"""
+        return BitSplashWaves(self, splash_pads, margin)
+
+    def fill_rect(self, x, y, width, height, state):
+        """Set every cell of a rectangle (clipped to the grid) to the given state"""
+        left, right = max(0, x), min(self.width, x + width)
+        rows = range(max(0, y), min(self.height, y + height))
+        if left >= right:
+            return
+        mask = ((1 << (right - left)) - 1) << left
+        for layer in self.layers.values():
+            for row in rows:
+                layer[row] &= ~mask
+        target = self.layer(state) if state else None
+        occupied = self.occupied
+        for row in rows:
+            if target is None:
+                occupied[row] &= ~mask
+            else:
+                target[row] |= mask
+                occupied[row] |= mask
+
+    def is_valid_position(self, x, y, width, height):
+        """Check if a position is valid (within bounds and not overlapping priority areas)"""
+        if x < 0 or y < 0 or x + width > self.width or y + height > self.height:
+            return False
+        # Only allow empty and barriers: no occupied cell outside those layers under the shifted footprint
+        mask = ((1 << width) - 1) << x
+        passable = [self.layers.get(state) for state in PASSABLE if state]
+        for row in range(y, y + height):
+            blocked = self.occupied[row]
+            for layer in passable:
+                if layer is not None:
+                    blocked &= ~layer[row]
+            if blocked & mask:
+                return False
+        return True
+
+    def place_barrier(self, x, y, width, height, state):
+        """Place a barrier at the given position"""
+        self.fill_rect(x, y, width, height, state)
+
+    def remove_barrier(self, x, y, width, height):
+        """Remove a barrier from the given position (set to empty)"""
+        self.fill_rect(x, y, width, height, 0)
+
+    def setup_metadata_edges(self, current_level, total_levels=8):
+        """Setup the metadata edges with level progression indicators"""
+        self.fill_rect(0, 0, self.width, 3, 6)   # Metadata zone
+        self.fill_rect(0, self.height - 3, self.width, 3, 6)
+        self.fill_rect(0, 0, 3, self.height, 6)
+        self.fill_rect(self.width - 3, 0, 3, self.height, 6)
+
+        # Level progression indicators (top edge, centered), one empty metadata block between each
+        level_start_x = self.width // 2 - (total_levels * 2 - 1) // 2
+        for level in range(total_levels):
+            x = level_start_x + level * 2
+            if 3 <= x < self.width - 3:
+                state = 7 if level < current_level - 1 else 8 if level == current_level - 1 else 9
+                self.fill_rect(x, 1, 1, 1, state)
+
+    band = Grid.band
+
+    def band_rows(self, direction, index, margin=3):
+        """Rows of a band and the bitmask of its cells in each of them"""
+        dx, dy = FLOOD_DIRECTIONS[direction]
+        if dx == 0:
+            return range(index, index + 1), ((1 << (self.width - 2 * margin)) - 1) << margin
+        return range(margin, self.height - margin), 1 << index
+
+    def mark_tide_source(self, direction, margin=3):
+        """Make the edge row or column the tide comes from tide (but not in metadata zone)"""
+        dx, dy = FLOOD_DIRECTIONS[direction]
+        edge = 0 if dx + dy > 0 else (self.height if dx == 0 else self.width) - 1
+        rows, mask = self.band_rows(direction, edge, margin)
+        for row in rows:
+            self.flood_cells(row, mask)
+
+    def flood_cells(self, row, mask):
+        """Make the cells of a row in a bitmask tide (state 2)"""
+        for layer in self.layers.values():
+            layer[row] &= ~mask
+        self.layer(2)[row] |= mask
+        self.occupied[row] |= mask
+
+    def flood_band(self, direction, index, shadow, margin=3):
+        """Flood the empty and priority cells of one band that are not shadowed (BitShadowCoverage or row bitmasks)"""
+        shadow = getattr(shadow, 'rows', shadow)
+        tide = self.layer(2)
+        priority = self.layers.get(1)
+        rows, band = self.band_rows(direction, index, margin)  # Don't flood metadata zone
+        for row in rows:
+            floodable = ~self.occupied[row]
+            if priority is not None:
+                floodable |= priority[row]
+            flooded = floodable & ~shadow[row] & band
+            if flooded:
+                if priority is not None:
+                    priority[row] &= ~flooded
+                tide[row] |= flooded  # State 2 = tide
+                self.occupied[row] |= flooded
+
+    def check_priority_wet(self, priority_zones):
+        """Check if any priority zone has been touched by the tide"""
+        tide = self.layers.get(2)
+        if tide is None:
+            return False
+        for zone_x, zone_y, zone_size in priority_zones:
+            zone = ((1 << zone_size) - 1) << zone_x
+            for row in range(zone_y, zone_y + zone_size):
+                if tide[row] & zone:
+                    return True
+        return False
+
+    def mark_priority_wet(self, priority_zones):
+        """Mark all priority zones as wet (game over state)"""
+        for zone_x, zone_y, zone_size in priority_zones:
+            self.fill_rect(zone_x, zone_y, zone_size, zone_size, 10)  # Wet priority (red)
+
+class BitSplashWaves(SplashWaves):
+    """SplashWaves for BitGrid: the lane heads of each direction are lists of (row, col), same rules"""
+
+    def __init__(self, grid, splash_pads, margin=3):
+        self.grid = grid
+        self.splash_pads = list(splash_pads)  # List of (x, y, size)
+        self.margin = margin
+        self.pad_ids = {}  # (row, col) -> pad
+        for pad, (pad_x, pad_y, pad_size) in enumerate(self.splash_pads):
+            for row in range(pad_y, pad_y + pad_size):
+                for col in range(pad_x, pad_x + pad_size):
+                    self.pad_ids[row, col] = pad
+        self.spawned = set()  # (pad, side) fronts already sent
+        self.queue = collections.deque()  # Pending (pad, side) fronts
+        self.fronts = {}  # Side -> (rows, cols) of the lane heads moving away from that side
+        self.visited = {}  # Side -> cells a lane moving that way has entered
+
+    def hit_band(self, direction, band, shadow):
+        """Hit the pads in a band a main tide front just reached, unless they are in its shadow"""
+        shadow = getattr(shadow, 'rows', shadow)
+        index = band[0] if FLOOD_DIRECTIONS[direction][0] == 0 else band[1]
+        rows, mask = self.grid.band_rows(direction, index, self.margin)
+        for pad, (pad_x, pad_y, pad_size) in enumerate(self.splash_pads):
+            pad_mask = ((1 << pad_size) - 1) << pad_x
+            for row in range(max(pad_y, rows.start), min(pad_y + pad_size, rows.stop)):
+                if pad_mask & mask & ~shadow[row]:
+                    self.hit(pad, direction)
+                    break
+
+    def step(self, tick, arrival=None):
+        """Advance every lane by one cell, then start the queued fronts (they move from the next tick)"""
+        grid = self.grid
+        height, width = grid.shape
+        margin = self.margin
+        for side, (rows, cols) in self.fronts.items():
+            if not rows:
+                continue
+            dx, dy = FLOOD_DIRECTIONS[side]
+            visited = self.visited.get(side)
+            if visited is None:
+                visited = self.visited[side] = set()
+            moving_rows, moving_cols = [], []
+            for row, col in zip(rows, cols):
+                row, col = row + dy, col + dx
+                # Drop lanes leaving the playable area, or entering a cell a lane moving the same way already took
+                if not (margin <= row < height - margin and margin <= col < width - margin) or (row, col) in visited:
+                    continue
+                visited.add((row, col))
+                state = grid.get(col, row)
+                if state in FLOODABLE:
+                    grid.flood_cells(row, 1 << col)  # State 2 = tide
+                pad = self.pad_ids.get((row, col))
+                if pad is not None:
+                    self.hit(pad, side)
+                # Lanes go on through water, stop at pads and anything else the tide cannot enter
+                if state in FLOODABLE or state == 2:
+                    moving_rows.append(row)
+                    moving_cols.append(col)
+            self.fronts[side] = (moving_rows, moving_cols)
+
+        while self.queue:
+            pad, side = self.queue.popleft()
+            pad_x, pad_y, pad_size = self.splash_pads[pad]
+            dx, dy = FLOOD_DIRECTIONS[side]
+            # Lanes start on the pad's far edge
+            if dx == 0:
+                rows = [pad_y + pad_size - 1 if dy > 0 else pad_y] * pad_size
+                cols = [pad_x + lane for lane in range(pad_size)]
+            else:
+                rows = [pad_y + lane for lane in range(pad_size)]
+                cols = [pad_x + pad_size - 1 if dx > 0 else pad_x] * pad_size
+            front_rows, front_cols = self.fronts.get(side, ([], []))
+            self.fronts[side] = (front_rows + rows, front_cols + cols)
+
+# ---------- Large boards ----------
+
+CHUNK_SIZE = 64  # Cells per side of a ChunkedGrid chunk
+LARGE_BOARD_CELLS = 256 * 256  # Levels with more cells than this are stored in a ChunkedGrid
+
+def bits_to_mask(bits, count):
+    """The lowest count bits of an int as a boolean array, lowest bit first"""
+    bits &= (1 << count) - 1
+    if not bits:
+        return np.zeros(count, dtype=bool)
+    packed = np.frombuffer(bits.to_bytes((count + 7) // 8, 'little'), dtype=np.uint8)
+    return np.unpackbits(packed, count=count, bitorder='little').view(bool)
+
+class ChunkedGrid:
+    """Grid of cell states for large boards, stored as CHUNK_SIZE x CHUNK_SIZE uint8 chunks.
+
+    A chunk whose cells all share one state is stored as just that state (a missing chunk is
+    empty) and only becomes an array when part of it is written, so open ocean costs nothing.
+    A flood band only touches the chunks it crosses, and chunks it leaves completely flooded
+    collapse back to a single state. Shadows are row bitmasks (BitShadowCoverage).
+    """
+
+    def __init__(self, width=GRID_W, height=GRID_H, chunk_size=CHUNK_SIZE):
+        self.width = width
+        self.height = height
+        self.chunk_size = chunk_size
+        self.chunks = {}  # (chunk row, chunk col) -> uint8 array, or the state of every cell of the chunk
+
+    def __getitem__(self, y):
+        # A copy of the row's states (writes do not reach the grid)
+        return self.region(0, y, self.width, 1)[0]
+
+    def __len__(self):
+        return self.height
+
+    @property
+    def shape(self):
+        return self.height, self.width
+
+    @property
+    def allocated(self):
+        """Number of chunks stored as arrays"""
+        return sum(isinstance(chunk, np.ndarray) for chunk in self.chunks.values())
+
+    def spans(self, start, stop):
+        """(chunk index, start and stop inside the chunk, offset from start) of each chunk a range of cells crosses"""
+        size = self.chunk_size
+        for index in range(start // size, (stop - 1) // size + 1):
+            low, high = max(start, index * size), min(stop, (index + 1) * size)
+            yield index, low - index * size, high - index * size, low - start
+
+    def chunk(self, key):
+        """The array of a chunk, allocating it if it is stored as a single state"""
+        chunk = self.chunks.get(key, 0)
+        if not isinstance(chunk, np.ndarray):
+            chunk = self.chunks[key] = np.full((self.chunk_size, self.chunk_size), chunk, dtype=np.uint8)
+        return chunk
+
+    def compact(self, key):
+        """Store a chunk as a single state if all of its cells (inside the grid) share one"""
+        chunk = self.chunks.get(key)
+        if isinstance(chunk, np.ndarray):
+            size = self.chunk_size
+            inside = chunk[:self.height - key[0] * size, :self.width - key[1] * size]
+            state = int(inside[0, 0])
+            if (inside == state).all():
+                if state:
+                    self.chunks[key] = state
+                else:
+                    del self.chunks[key]
+
+    def get(self, x, y):
+        """State of one cell"""
+        chunk = self.chunks.get((y // self.chunk_size, x // self.chunk_size), 0)
+        if isinstance(chunk, np.ndarray):
+            return int(chunk[y % self.chunk_size, x % self.chunk_size])
+        return chunk
+
+    def region(self, x, y, width, height):
+        """Copy of the cell states of a rectangle (clipped to the grid) as a uint8 array"""
+        left, top = max(0, x), max(0, y)
+        right, bottom = min(self.width, x + width), min(self.height, y + height)
+        cells = np.zeros((max(0, bottom - top), max(0, right - left)), dtype=np.uint8)
+        if not cells.size:
+            return cells
+        for chunk_row, row_start, row_stop, row_offset in self.spans(top, bottom):
+            for chunk_col, col_start, col_stop, col_offset in self.spans(left, right):
+                chunk = self.chunks.get((chunk_row, chunk_col), 0)
+                out = cells[row_offset:row_offset + row_stop - row_start, col_offset:col_offset + col_stop - col_start]
+                if isinstance(chunk, np.ndarray):
+                    out[:] = chunk[row_start:row_stop, col_start:col_stop]
+                elif chunk:
+                    out.fill(chunk)
+        return cells
+
+    def clear(self):
+        """Set every cell back to empty"""
+        self.chunks = {}
+
+    def snapshot(self):
+        """Copy of the chunks, for restore()"""
+        chunks = {}
+        for key, chunk in self.chunks.items():
+            if isinstance(chunk, np.ndarray):
+                chunk = chunk.copy()
+                chunk.setflags(write=False)
+            chunks[key] = chunk
+        return chunks
+
+    def restore(self, snapshot):
+        """Set the chunks back to a snapshot()"""
+        self.chunks = {key: chunk.copy() if isinstance(chunk, np.ndarray) else chunk
+                       for key, chunk in snapshot.items()}
+
+    def state_bytes(self):
+        """Cell states, one byte per cell, row by row"""
+        return self.region(0, 0, self.width, self.height).tobytes()
+
+    def shadow_coverage(self, barriers, direction='top'):
+        """Shadow coverage of barriers facing a tide from the given side, for this backend"""
+        return BitShadowCoverage(barriers, self.shape, direction)
+
+    def splash_waves(self, splash_pads, margin=3):
+        """Splash wavefronts for this backend"""
+        return BitSplashWaves(self, splash_pads, margin)
+
+    def fill_rect(self, x, y, width, height, state):
+        """Set every cell of a rectangle (clipped to the grid) to the given state"""
+        left, top = max(0, x), max(0, y)
+        right, bottom = min(self.width, x + width), min(self.height, y + height)
+        if left >= right or top >= bottom:
+            return
+        size = self.chunk_size
+        for chunk_row, row_start, row_stop, row_offset in self.spans(top, bottom):
+            whole_rows = row_start == 0 and row_stop == min(size, self.height - chunk_row * size)
+            for chunk_col, col_start, col_stop, col_offset in self.spans(left, right):
+                key = (chunk_row, chunk_col)
+                if whole_rows and col_start == 0 and col_stop == min(size, self.width - chunk_col * size):
+                    # Covers the whole chunk: no array needed
+                    if state:
+                        self.chunks[key] = state
+                    else:
+                        self.chunks.pop(key, None)
+                else:
+                    self.chunk(key)[row_start:row_stop, col_start:col_stop] = state
+
+    def is_valid_position(self, x, y, width, height):
+        """Check if a position is valid (within bounds and not overlapping priority areas)"""
+        if x < 0 or y < 0 or x + width > self.width or y + height > self.height:
+            return False
+        # Only allow empty and barriers
+        return bool(PASSABLE_STATES[self.region(x, y, width, height)].all())
+
+    def place_barrier(self, x, y, width, height, state):
+        """Place a barrier at the given position"""
+        self.fill_rect(x, y, width, height, state)
+
+    def remove_barrier(self, x, y, width, height):
+        """Remove a barrier from the given position (set to empty)"""
+        self.fill_rect(x, y, width, height, 0)
+
+    setup_metadata_edges = BitGrid.setup_metadata_edges
+    band = Grid.band
+    band_rows = BitGrid.band_rows
+
+    def mark_tide_source(self, direction, margin=3):
+        """Make the edge row or column the tide comes from tide (but not in metadata zone)"""
+        dx, dy = FLOOD_DIRECTIONS[direction]
+        if dx == 0:
+            edge = 0 if dy > 0 else self.height - 1
+            self.fill_rect(margin, edge, self.width - 2 * margin, 1, 2)
+        else:
+            edge = 0 if dx > 0 else self.width - 1
+            self.fill_rect(edge, margin, 1, self.height - 2 * margin, 2)
+
+    def flood_cells(self, row, mask):
+        """Make the cells of a row in a bitmask tide (state 2)"""
+        for x, run in bit_runs(mask):
+            self.fill_rect(x, row, run, 1, 2)
+
+    def flood_band(self, direction, index, shadow, margin=3):
+        """Flood the empty and priority cells of one band that are not shadowed (BitShadowCoverage or row bitmasks)"""
+        shadow = getattr(shadow, 'rows', shadow)
+        size = self.chunk_size
+        dx, dy = FLOOD_DIRECTIONS[direction]
+        line, local = divmod(index, size)  # Chunk row (or column) of the band and the band's place in it
+        touched = []
+        shadowed = None  # Shadowed cells of the band, if any
+        if dx == 0:
+            spans = self.spans(margin, self.width - margin)  # Don't flood metadata zone
+            row_shadow = shadow[index]
+        else:
+            spans = self.spans(margin, self.height - margin)
+            column = [shadow[row] >> index & 1 for row in range(margin, self.height - margin)]
+            if any(column):
+                shadowed = np.array(column, dtype=bool)
+        for other, start, stop, offset in spans:
+            key = (line, other) if dx == 0 else (other, line)
+            chunk = self.chunks.get(key, 0)
+            if not isinstance(chunk, np.ndarray) and not FLOODABLE_STATES[chunk]:
+                continue  # Nothing here the tide can enter (all tide already, metadata, ...)
+            if dx == 0:
+                cells = self.chunk(key)[local, start:stop]
+                if row_shadow:
+                    shadowed = bits_to_mask(row_shadow >> (other * size + start), stop - start)
+                blocked = shadowed
+            else:
+                cells = self.chunk(key)[start:stop, local]
+                blocked = None if shadowed is None else shadowed[offset:offset + stop - start]
+            floods = FLOODABLE_STATES[cells]
+            if blocked is not None:
+                floods &= ~blocked
+            cells[floods] = 2  # State 2 = tide
+            touched.append(key)
+        if local == (size - 1 if dx + dy > 0 else 0):
+            # The front is leaving these chunks
+            for key in touched:
+                self.compact(key)
+
+    def check_priority_wet(self, priority_zones):
+        """Check if any priority zone has been touched by the tide"""
+        for zone_x, zone_y, zone_size in priority_zones:
+            if (self.region(zone_x, zone_y, zone_size, zone_size) == 2).any():  # Tide
+                return True
+        return False
+
+    def mark_priority_wet(self, priority_zones):
+        """Mark all priority zones as wet (game over state)"""
+        for zone_x, zone_y, zone_size in priority_zones:
+            self.fill_rect(zone_x, zone_y, zone_size, zone_size, 10)  # Wet priority (red)
+
+# Grid backend the game uses: NumPy arrays when available, bitboards otherwise
+GRID_BACKEND = Grid if np is not None else BitGrid
+
 def setup_metadata_edges(grid, current_level, total_levels=8):
     """Setup the metadata edges with level progression indicators"""
-    # Clear all edge pixels first
-    for x in range(GRID_W):
-        for y in range(GRID_H):
-            if (x < 3 or x >= GRID_W - 3 or y < 3 or y >= GRID_H - 3):
-                grid[y][x] = 6  # Metadata zone
-    
-    # Add level progression indicators (top edge, centered)
-    level_start_x = GRID_W // 2 - total_levels // 2
-    for i in range(total_levels):
-        x = level_start_x + i
-        if x >= 3 and x < GRID_W - 3:  # Within metadata zone
-            if i < current_level - 1:
-                grid[1][x] = 7  # Passed level (green)
-            elif i == current_level - 1:
-                grid[1][x] = 8  # Current level (yellow)
-            else:
-                grid[1][x] = 9  # Future level (red)
-    
-    # Add empty metadata blocks between level indicators
-    for i in range(total_levels - 1):
-        x = level_start_x + i + 0.5  # Between levels
-        if int(x) >= 3 and int(x) < GRID_W - 3:
-            grid[1][int(x)] = 6  # Empty metadata
+    grid.setup_metadata_edges(current_level, total_levels)
 
 def check_priority_wet(grid, priority_zones):
     """Check if any priority zone has been touched by the tide"""
-    for zone in priority_zones:
-        zone_x, zone_y, zone_size = zone
-        for dy in range(zone_size):
-            for dx in range(zone_size):
-                if grid[zone_y + dy][zone_x + dx] == 2:  # Tide
-                    return True
-    return False
+    return grid.check_priority_wet(priority_zones)
 
 def mark_priority_wet(grid, priority_zones):
     """Mark all priority zones as wet (game over state)"""
-    for zone in priority_zones:
-        zone_x, zone_y, zone_size = zone
-        for dy in range(zone_size):
-            for dx in range(zone_size):
-                grid[zone_y + dy][zone_x + dx] = 10  # Wet priority (red)
+    grid.mark_priority_wet(priority_zones)
 
 def is_level_complete(grid, flood_active=False):
     """Check if the current level is complete (flood ended and priority stayed dry)"""
     if flood_active:
         return False
     
-    # Check if flood has reached the bottom
-    for x in range(GRID_W):
-        if grid[GRID_H - 1][x] == 2:  # Tide at bottom
-            return True
-    
-    return False
+    # Check if flood has reached the bottom (grid[y] is the row's states on every backend)
+    return 2 in grid[grid.height - 1]  # Tide at bottom
 
-def setup_level_1(grid):
-    """Setup Level 1: Single priority zone, one strong barrier"""
+# Built-in levels, in the same JSON-compatible format as the levels in a level pack:
+#   width, height    grid size
+#   intro            caption shown when the level is entered (optional)
+#   tide             sides the tide comes from (FLOOD_DIRECTIONS names)
+#   priority_zones   [x, y, size] squares to keep dry
+#   barriers         [x, y, width, height, is_weak] at their starting positions
+#   splash_pads      [x, y, size] squares that bounce the tide sideways
+LEVELS = [
+    {   # Level 1: Single priority zone, one strong barrier
+        'width': GRID_W, 'height': GRID_H,
+        'intro': "Level 1: Press SPACE to start the flood!",
+        'tide': ['top'],
+        'priority_zones': [[GRID_W // 2 - 2, GRID_H - 13, 4]],  # Centered, near bottom but above metadata zone
+        'barriers': [[10, 20, 16, 3, False]],
+        'splash_pads': [],
+    },
+    {   # Level 2: Two priority zones, one strong barrier, one weak barrier
+        'width': GRID_W, 'height': GRID_H,
+        'intro': "Level 2: Two priority zones! Press SPACE to start the flood!",
+        'tide': ['top'],
+        'priority_zones': [[GRID_W // 2 - 2, GRID_H - 13, 4], [GRID_W // 4 - 1, GRID_H - 13, 2]],
+        'barriers': [[15, 25, 12, 3, False], [45, 25, 12, 3, True]],
+        'splash_pads': [],
+    },
+    {   # Level 3: One priority zone, a splash pad bouncing the tide at it, two barriers
+        'width': GRID_W, 'height': GRID_H,
+        'intro': "Level 3: Watch the splash pad! Press SPACE to start the flood!",
+        'tide': ['top'],
+        'priority_zones': [[GRID_W // 4 - 1, GRID_H - 13, 2]],
+        'barriers': [[10, 20, 16, 3, False], [40, 20, 12, 3, True]],
+        'splash_pads': [[3 * GRID_W // 4 - 4, GRID_H - 14, 3]],  # Level with the zone, so its splash runs into it
+    },
+]
+
+def setup_level(grid, level, current_level, total_levels):
+    """Setup a level's metadata edges, tide sources, priority zones and splash pads (no barriers)"""
     # Clear grid
-    for y in range(GRID_H):
-        for x in range(GRID_W):
-            grid[y][x] = 0
+    grid.clear()
     
     # Setup metadata edges
-    setup_metadata_edges(grid, 1, 8)
+    setup_metadata_edges(grid, current_level, total_levels)
     
-    # Make top row tide initially (but not in metadata zone)
-    for x in range(3, GRID_W - 3):
-        grid[0][x] = 2  # State 2 = tide (blue)
+    # Make the edges the tide comes from tide initially (but not in metadata zone)
+    for side in resolve_tide_sources(level['tide']):
+        grid.mark_tide_source(side)
     
-    # Position for the 4x4 priority box (near bottom, but not in metadata zone)
-    box_x = GRID_W // 2 - 2  # Center the box
-    box_y = GRID_H - 13      # Near bottom but above metadata zone
+    # Place the priority boxes (state 1 = white)
+    for zone_x, zone_y, zone_size in level['priority_zones']:
+        grid.fill_rect(zone_x, zone_y, zone_size, zone_size, 1)
     
-    # Place the priority box (state 1 = white)
-    for dy in range(4):
-        for dx in range(4):
-            grid[box_y + dy][box_x + dx] = 1
+    # Place the splash pads (state 13 = cyan)
+    for pad_x, pad_y, pad_size in level.get('splash_pads', []):
+        grid.fill_rect(pad_x, pad_y, pad_size, pad_size, 13)
     
-    return [(box_x, box_y, 4)]  # Return priority zones
+    return [tuple(zone) for zone in level['priority_zones']]  # Return priority zones
+
+def setup_level_1(grid):
+    """Setup Level 1: Single priority zone, one strong barrier"""
+    return setup_level(grid, LEVELS[0], 1, len(LEVELS))
+
+def setup_level_2(grid):
+    """Setup Level 2: Two priority zones, one strong barrier, one weak barrier"""
+    return setup_level(grid, LEVELS[1], 2, len(LEVELS))
+
+def setup_level_3(grid):
+    """Setup Level 3: One priority zone, a splash pad bouncing the tide at it, two barriers"""
+    return setup_level(grid, LEVELS[2], 3, len(LEVELS))
+
+# Initial state of a level; shadows (side -> ShadowCoverage counts of the initial barriers) and colors
+# (cells mapped through PALETTE, rows x cols x RGB) only for the Grid backend, otherwise None
+LevelLayers = collections.namedtuple('LevelLayers', ['cells', 'shadows', 'colors'])
+
+def level_key(level):
+    """Canonical JSON text of a level definition"""
+    return json.dumps(level, sort_keys=True, separators=(',', ':'))
+
+def level_cache_path(key, current_level, total_levels):
+    """File in LEVEL_CACHE_DIR for a level's built initial state (None when the cache is off)"""
+    if not LEVEL_CACHE_DIR:
+        return None
+    digest = hashlib.sha256(f"{LEVEL_CACHE_VERSION}:{current_level}/{total_levels}:{key}".encode('utf-8'))
+    return os.path.join(LEVEL_CACHE_DIR, digest.hexdigest()[:32] + '.level')
+
+# A level cache file is the raw bytes of the cells, the colors, then the shadow counts for each
+# tide side in the order of resolve_tide_sources; it is read back in one read
+def level_cache_layout(width, height, sides):
+    """(dtype, shape, bytes) of each array in a level cache file"""
+    cells = width * height
+    return ([(np.uint8, (height, width), cells), (np.uint8, (height, width, 3), 3 * cells)]
+            + [(np.uint16, (height, width), 2 * cells)] * len(sides))
+
+def load_cached_layers(path, width, height, sides):
+    """LevelLayers from a level cache file, or None if it is missing or not the expected size"""
+    layout = level_cache_layout(width, height, sides)
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    if len(data) != sum(size for dtype, shape, size in layout):
+        return None
+    # Arrays over the bytes read are read-only, like the ones a level is built with
+    arrays, offset = [], 0
+    for dtype, shape, size in layout:
+        arrays.append(np.frombuffer(data, dtype=dtype, count=size // np.dtype(dtype).itemsize,
+                                    offset=offset).reshape(shape))
+        offset += size
+    cells, colors, *shadows = arrays
+    return LevelLayers(cells, dict(zip(sides, shadows)), colors)
+
+def trim_level_cache(directory, max_bytes=None):
+    """Remove the oldest level cache files until the directory holds at most max_bytes of them"""
+    max_bytes = LEVEL_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    try:
+        files = [(entry.stat().st_mtime, entry.stat().st_size, entry.path)
+                 for entry in os.scandir(directory) if entry.name.endswith('.level')]
+    except OSError:
+        return
+    total = sum(size for mtime, size, path in files)
+    for mtime, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        with contextlib.suppress(OSError):
+            os.remove(path)
+            total -= size
+
+def save_cached_layers(path, layers):
+    """Write LevelLayers to a level cache file (written whole then renamed; a read-only cache is skipped),
+    then trim the cache to LEVEL_CACHE_MAX_BYTES"""
+    partial = f"{path}.{os.getpid()}.tmp"
+    height, width = layers.cells.shape
+    layout = level_cache_layout(width, height, layers.shadows)
+    arrays = (layers.cells, layers.colors, *layers.shadows.values())
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(partial, 'wb') as f:
+            for array, (dtype, shape, size) in zip(arrays, layout):
+                f.write(np.ascontiguousarray(array, dtype=dtype).tobytes())
+        os.replace(partial, path)
+    except OSError:
+        with contextlib.suppress(OSError):
+            os.remove(partial)
+        return
+    trim_level_cache(os.path.dirname(path))
+
+@functools.lru_cache(maxsize=64)
+def _level_layers(key, current_level, total_levels, grid_class):
+    level = json.loads(key)
+    sides = resolve_tide_sources(level['tide'])
+    # Grid levels are cached on disk: a level's first frame loads instead of being built
+    path = level_cache_path(key, current_level, total_levels) if grid_class is Grid else None
+    if path is not None:
+        layers = load_cached_layers(path, level['width'], level['height'], sides)
+        if layers is not None:
+            return layers
+
+    grid = grid_class(level['width'], level['height'])
+    setup_level(grid, level, current_level, total_levels)
+    for barrier_x, barrier_y, barrier_width, barrier_height, is_weak in level['barriers']:
+        place_barrier(grid, barrier_x, barrier_y, barrier_width, barrier_height, 11 if is_weak else 3)
+    if grid_class is not Grid:
+        return LevelLayers(grid.snapshot(), None, None)
+    shadows = {}
+    for side in sides:
+        shadows[side] = grid.shadow_coverage(level['barriers'], side).counts
+        shadows[side].setflags(write=False)
+    colors = PALETTE[grid.cells]
+    colors.setflags(write=False)
+    layers = LevelLayers(grid.snapshot(), shadows, colors)
+    if path is not None:
+        save_cached_layers(path, layers)
+    return layers
+
+def level_layers(level, current_level, total_levels, grid_class=None):
+    """Initial cells of a level (with its barriers), and for Grid its shadow counts and colors, built
+    once and cached (LevelLayers).
+
+    Cells are in the grid backend's format (grid_class, GRID_BACKEND by default): for Grid,
+    read-only arrays. Grid levels are also cached on disk in LEVEL_CACHE_DIR, so later runs load them.
+    """
+    return _level_layers(level_key(level), current_level, total_levels, grid_class or GRID_BACKEND)
 
-def reset_level(grid, current_level, barriers, priority_zones):
+def reset_level(grid, current_level, barriers, priority_zones, levels=LEVELS):
     """Reset the current level to its initial state"""
     # Clear grid
-    for y in range(GRID_H):
-        for x in range(GRID_W):
-            grid[y][x] = 0
+    grid.clear()
     
     # Setup level based on current level
-    if current_level == 1:
-        priority_zones = setup_level_1(grid)
+    if 1 <= current_level <= len(levels):
+        level = levels[current_level - 1]
+        grid.restore(level_layers(level, current_level, len(levels), type(grid)).cells)
+        priority_zones = [tuple(zone) for zone in level['priority_zones']]
         
-        # Reset barriers for level 1
+        # Reset barriers (inactive)
         barriers.clear()
-        barrier_x, barrier_y = 10, 20
-        barrier_width, barrier_height = 16, 3
-        barriers.append((barrier_x, barrier_y, barrier_width, barrier_height, False, False))  # Strong, inactive
-        place_barrier(grid, barrier_x, barrier_y, barrier_width, barrier_height, 3)
-        
-    elif current_level == 2:
-        priority_zones = setup_level_2(grid)
-        
-        # Reset barriers for level 2
-        barriers.clear()
-        
-        # Add strong barrier (12 pixels)
-        strong_barrier_x, strong_barrier_y = 15, 25
-        barriers.append((strong_barrier_x, strong_barrier_y, 12, 3, False, False))
-        place_barrier(grid, strong_barrier_x, strong_barrier_y, 12, 3, 3)
-        
-        # Add weak barrier (12 pixels)
-        weak_barrier_x, weak_barrier_y = 45, 25
-        barriers.append((weak_barrier_x, weak_barrier_y, 12, 3, True, False))
-        place_barrier(grid, weak_barrier_x, weak_barrier_y, 12, 3, 11)
+        for barrier_x, barrier_y, barrier_width, barrier_height, is_weak in level['barriers']:
+            barriers.append((barrier_x, barrier_y, barrier_width, barrier_height, bool(is_weak), False))
     
     return priority_zones
 
-def setup_level_2(grid):
-    """Setup Level 2: Two priority zones, one strong barrier, one weak barrier"""
-    # Clear grid
-    for y in range(GRID_H):
-        for x in range(GRID_W):
-            grid[y][x] = 0
-    
-    # Setup metadata edges
-    setup_metadata_edges(grid, 2, 8)
-    
-    # Make top row tide initially (but not in metadata zone)
-    for x in range(3, GRID_W - 3):
-        grid[0][x] = 2  # State 2 = tide (blue)
-    
-    # Position for the 4x4 priority box (larger zone)
-    large_box_x = GRID_W // 2 - 2  # Center the box
-    large_box_y = GRID_H - 13      # Near bottom but above metadata zone
-    
-    # Position for the 2x2 priority box (smaller zone)
-    small_box_x = GRID_W // 4 - 1  # Left side
-    small_box_y = GRID_H - 13      # Same height as large box
-    
-    # Place the priority boxes (state 1 = white)
-    for dy in range(4):
-        for dx in range(4):
-            grid[large_box_y + dy][large_box_x + dx] = 1
-    
-    for dy in range(2):
-        for dx in range(2):
-            grid[small_box_y + dy][small_box_x + dx] = 1
-    
-    return [(large_box_x, large_box_y, 4), (small_box_x, small_box_y, 2)]  # Return priority zones
+# Level pack file: header (magic, level count), then a table of (offset, length) per level,
+# then each level as zlib-compressed JSON
+PACK_MAGIC = b'STTPACK1'
+PACK_HEADER = struct.Struct('<8sI')
+PACK_ENTRY = struct.Struct('<QI')
+
+def write_level_pack(path, levels):
+    """Write level definitions to a level pack file"""
+    blobs = [zlib.compress(level_key(level).encode('utf-8'), 9) for level in levels]
+    offset = PACK_HEADER.size + PACK_ENTRY.size * len(blobs)
+    with open(path, 'wb') as pack:
+        pack.write(PACK_HEADER.pack(PACK_MAGIC, len(blobs)))
+        for blob in blobs:
+            pack.write(PACK_ENTRY.pack(offset, len(blob)))
+            offset += len(blob)
+        for blob in blobs:
+            pack.write(blob)
+
+class LevelPack:
+    """Levels in a level pack file, memory-mapped and each decoded only when it is first entered.
+
+    Opening a pack reads only its header, so startup does not grow with the number of levels.
+    Supports len() and indexing (0-based) like the LEVELS list.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as pack:
+            self.data = mmap.mmap(pack.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data.size() < PACK_HEADER.size:
+            raise ValueError(f"Not a level pack: {path}")
+        magic, self.count = PACK_HEADER.unpack_from(self.data)
+        if magic != PACK_MAGIC:
+            raise ValueError(f"Not a level pack: {path}")
+        self.decoded = {}  # Index -> level definition
+        self._digest = None
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def digest(self):
+        """SHA-256 of the pack file, hashed from the mapped bytes the first time it is asked for"""
+        if self._digest is None:
+            self._digest = hashlib.sha256(self.data).hexdigest()
+        return self._digest
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        if index not in self.decoded:
+            offset, length = PACK_ENTRY.unpack_from(self.data, PACK_HEADER.size + PACK_ENTRY.size * index)
+            self.decoded[index] = json.loads(zlib.decompress(self.data[offset:offset + length]))
+        return self.decoded[index]
+
+    def close(self):
+        self.data.close()
+
+# Phases of a frame the profiler times
+PROFILE_PHASES = ('input', 'flood', 'priority', 'shadows', 'draw')
+PROFILE_COLUMNS = {phase: i for i, phase in enumerate(PROFILE_PHASES)}  # The last column is the whole frame
+NO_PHASE = contextlib.nullcontext()
+
+class FrameProfiler:
+    """Time spent in each phase of the last capacity frames, kept in a ring buffer.
+
+    Phases nest: time spent in a phase opened inside another only counts for the inner one.
+    While disabled, phase() hands out a shared no-op context manager and nothing is recorded.
+    """
+
+    def __init__(self, enabled=False, capacity=1024):
+        self.capacity = capacity
+        self.enabled = False
+        self.frames = 0  # Frames recorded so far (the buffer keeps the last capacity of them)
+        self.row = None  # Buffer row of the frame being recorded
+        self.durations = None  # Seconds per (frame, phase), allocated when first enabled
+        self.starts = None  # perf_counter when each phase first started in each frame
+        self.stack = []  # [column, start, time spent in nested phases] of the open phases
+        self.pending = None
+        if enabled:
+            self.enable()
+
+    def enable(self):
+        """Start recording from the next frame"""
+        if self.durations is None:
+            self.durations = np.zeros((self.capacity, len(PROFILE_PHASES) + 1))
+            self.starts = np.zeros((self.capacity, len(PROFILE_PHASES) + 1))
+        self.enabled = True
+
+    def disable(self):
+        """Stop recording (keeping the frames recorded so far)"""
+        self.end_frame()
+        self.enabled = False
+
+    def begin_frame(self):
+        """Close the previous frame and start recording a new one"""
+        self.end_frame()
+        if self.enabled:
+            self.row = self.frames % self.capacity
+            self.durations[self.row] = 0
+            self.starts[self.row] = 0
+            self.starts[self.row, -1] = time.perf_counter()
+
+    def end_frame(self):
+        """Record the length of the frame being recorded, if any"""
+        if self.row is not None:
+            self.durations[self.row, -1] = time.perf_counter() - self.starts[self.row, -1]
+            self.frames += 1
+            self.row = None
+
+    def phase(self, name):
+        """Context manager timing one phase of the current frame"""
+        if self.row is None:
+            return NO_PHASE
+        self.pending = PROFILE_COLUMNS[name]
+        return self
+
+    def __enter__(self):
+        now = time.perf_counter()
+        if not self.starts[self.row, self.pending]:
+            self.starts[self.row, self.pending] = now
+        self.stack.append([self.pending, now, 0.0])
+
+    def __exit__(self, *exc_info):
+        column, start, nested = self.stack.pop()
+        elapsed = time.perf_counter() - start
+        self.durations[self.row, column] += elapsed - nested
+        if self.stack:
+            self.stack[-1][2] += elapsed
+
+    def recorded(self):
+        """Rows of the ring buffer holding recorded frames, oldest first"""
+        if self.frames <= self.capacity:
+            return np.arange(self.frames)
+        return (np.arange(self.capacity) + self.frames) % self.capacity
+
+    def percentiles(self, q=(50, 99)):
+        """Milliseconds per phase (and for the whole frame) at each percentile over the recorded frames"""
+        rows = self.recorded()
+        if not len(rows):
+            return {}
+        values = np.percentile(self.durations[rows] * 1000, q, axis=0)
+        return {name: tuple(float(v) for v in values[:, i]) for i, name in enumerate(PROFILE_PHASES + ('frame',))}
+
+    def dump(self, path):
+        """Write the recorded frames as CSV (path ending in .csv) or as a Chrome trace (anything else)"""
+        rows = self.recorded()
+        if path.endswith('.csv'):
+            with open(path, 'w') as f:
+                f.write(','.join(('frame', 'start_ms') + tuple(f'{name}_ms' for name in PROFILE_PHASES + ('frame',))))
+                f.write('\n')
+                for frame, row in enumerate(rows):
+                    values = self.durations[row] * 1000
+                    f.write(f"{frame},{self.starts[row, -1] * 1000:.3f}," + ','.join(f'{v:.4f}' for v in values))
+                    f.write('\n')
+            return
+
+        # Chrome trace (chrome://tracing, Perfetto): frames on one track, each phase on its own track.
+        # Phase events start where the phase first started in the frame and last for its own time.
+        origin = self.starts[rows[0], -1] if len(rows) else 0.0
+        events = [{'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': i, 'args': {'name': name}}
+                  for i, name in enumerate(('frame',) + PROFILE_PHASES)]
+        for frame, row in enumerate(rows):
+            for i, name in enumerate(PROFILE_PHASES + ('frame',)):
+                if self.durations[row, i] or name == 'frame':
+                    events.append({'name': name, 'ph': 'X', 'pid': 1, 'tid': (i + 1) % (len(PROFILE_PHASES) + 1),
+                                   'ts': (self.starts[row, i] - origin) * 1e6, 'dur': self.durations[row, i] * 1e6,
+                                   'args': {'frame': frame}})
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+def rect_difference(rect, other):
+    """Rectangles (x, y, width, height) covering the cells of rect that are not in other.
+
+    For a rectangle moved by one cell that is the single edge strip it entered.
+    """
+    x, y, width, height = rect
+    other_x, other_y, other_width, other_height = other
+    left, right = max(x, other_x), min(x + width, other_x + other_width)
+    top, bottom = max(y, other_y), min(y + height, other_y + other_height)
+    if left >= right or top >= bottom:
+        return [rect]
+    strips = []
+    # Full-height strips left and right of the overlap, then the rest of the overlap's columns above and below
+    if x < left:
+        strips.append((x, y, left - x, height))
+    if right < x + width:
+        strips.append((right, y, x + width - right, height))
+    if y < top:
+        strips.append((left, y, right - left, top - y))
+    if bottom < y + height:
+        strips.append((left, bottom, right - left, y + height - bottom))
+    return strips
+
+class BarrierIndex:
+    """Owner map from each cell to the barriers covering it, so the barrier under a cell is one lookup.
+
+    Overlapping barriers are stacked per cell, the last to arrive on top.
+    """
+
+    def __init__(self, barriers=()):
+        self.owners = {}  # (x, y) -> barrier indexes, bottom to top
+        for i, (barrier_x, barrier_y, barrier_width, barrier_height) in enumerate(b[:4] for b in barriers):
+            self.add(i, barrier_x, barrier_y, barrier_width, barrier_height)
+
+    def at(self, x, y):
+        """Index of the top barrier covering a cell, or None"""
+        owners = self.owners.get((x, y))
+        return owners[-1] if owners else None
+
+    def add(self, i, x, y, width, height):
+        """Put barrier i on top of the cells of a rectangle"""
+        for cell_y in range(y, y + height):
+            for cell_x in range(x, x + width):
+                self.owners.setdefault((cell_x, cell_y), []).append(i)
+
+    def raise_to_top(self, i, x, y, width, height):
+        """Put barrier i (already covering a rectangle) on top of every barrier it overlaps there"""
+        for cell_y in range(y, y + height):
+            for cell_x in range(x, x + width):
+                owners = self.owners[cell_x, cell_y]
+                if owners[-1] != i:
+                    owners.remove(i)
+                    owners.append(i)
+
+    def remove(self, i, x, y, width, height):
+        """Take barrier i off the cells of a rectangle; return (x, y, new top barrier or None) for each"""
+        uncovered = []
+        for cell_y in range(y, y + height):
+            for cell_x in range(x, x + width):
+                owners = self.owners[cell_x, cell_y]
+                owners.remove(i)
+                if not owners:
+                    del self.owners[cell_x, cell_y]
+                uncovered.append((cell_x, cell_y, owners[-1] if owners else None))
+        return uncovered
+
+class Simulation:
+    """Game state and rules (flooding, win/lose, level transitions, barrier selection) without pygame"""
+
+    def __init__(self, current_level=1, flood_speed=0.1, levels=LEVELS, profiler=None, grid_class=None):
+        self.profiler = profiler or FrameProfiler()  # Times the flood, priority checks and shadow updates
+        self.grid_class = grid_class  # Grid, BitGrid or ChunkedGrid (None: chosen per level by grid_class_for)
+        self.levels = levels  # Level definitions: LEVELS or a LevelPack
+        self.total_levels = len(levels)
+        self.current_level = current_level
+        self.flood_speed = flood_speed  # seconds per flood tick
+        self.time_scale = 1  # Game seconds per real second (INSTANT runs a flood to its end in one update)
+        self.grid = self.grid_class_for(GRID_W, GRID_H)(GRID_W, GRID_H)
+        self.barriers = []  # List of (x, y, width, height, is_weak, is_active)
+        self.priority_zones = []
+        self.load_level(current_level)
+
+    def load_level(self, level):
+        """Enter a level and reset it to its initial state"""
+        self.current_level = level
+        self.reset()
+        intro = self.level.get('intro') if self.level else None
+        self.caption = "Stem the Tide — " + (intro or f"Level {level}: Press SPACE to start the flood!")
+
+    def reset(self):
+        """Reset the current level to its initial state"""
+        self.level = None
+        if 1 <= self.current_level <= self.total_levels:
+            self.level = self.levels[self.current_level - 1]
+            width, height = self.level['width'], self.level['height']
+            grid_class = self.grid_class_for(width, height)
+            if self.grid.shape != (height, width) or type(self.grid) is not grid_class:
+                self.grid = grid_class(width, height)
+        self.priority_zones = reset_level(self.grid, self.current_level, self.barriers, self.priority_zones,
+                                          self.levels)
+        self.layers = None  # The level's cached initial state (LevelLayers)
+        if self.level:
+            self.layers = level_layers(self.level, self.current_level, self.total_levels, type(self.grid))
+        self.initial = True  # Grid still holds the level's initial state (layers), until a barrier is touched
+        self.tide_sources = resolve_tide_sources(self.level['tide'] if self.level else ('top',))
+        self.splash_pads = [tuple(pad) for pad in self.level.get('splash_pads', [])] if self.level else []
+        self.selected_barrier = None  # Index of currently selected barrier
+        self.index = BarrierIndex(self.barriers)
+        self.heatmap = None  # PlacementHeatmap, built the first time placement hints are asked for
+        self.flood_active = False
+        self.flood = None
+        self.flood_timer = 0
+        self.game_over = False
+        self.level_complete = False
+        if self.layers is not None and self.layers.shadows is not None:
+            # The initial barriers' shadows were cached with the level
+            self.shadows = {side: ShadowCoverage(shape=self.grid.shape, direction=side, counts=counts)
+                            for side, counts in self.layers.shadows.items()}
+        else:
+            self.rebuild_shadows()
+        self.caption = f"Stem the Tide — Level {self.current_level}: Press SPACE to start the flood!"
+
+    def grid_class_for(self, width, height):
+        """Grid backend for a board size: ChunkedGrid for large boards (with NumPy), else GRID_BACKEND"""
+        if self.grid_class is not None:
+            return self.grid_class
+        if np is not None and width * height > LARGE_BOARD_CELLS:
+            return ChunkedGrid
+        return GRID_BACKEND
+
+    def apply_input(self, action, *args):
+        """Apply a player input: 'reset', 'start', 'move' (dx, dy), 'click' (grid_x, grid_y)
+        or 'speed' (+1 / -1 step through TIME_SCALES)"""
+        if action == 'reset':
+            if not self.flood_active:
+                self.reset()
+        elif action == 'start':
+            if not self.flood_active and not self.game_over:
+                self.start_flood()
+        elif action == 'move':
+            if self.selected_barrier is not None and not self.game_over:
+                self.move_selected_barrier(*args)
+        elif action == 'click':
+            if not self.game_over:
+                self.click(*args)
+        elif action == 'speed':
+            index = clamp(TIME_SCALES.index(self.time_scale) + args[0], 0, len(TIME_SCALES) - 1)
+            self.time_scale = TIME_SCALES[index]
+        else:
+            raise ValueError(f"Unknown input: {action!r}")
+
+    def rebuild_shadows(self):
+        """Rebuild the shadow coverage facing each tide source for the current barrier positions"""
+        with self.profiler.phase('shadows'):
+            self.shadows = {side: self.grid.shadow_coverage(self.barriers, side) for side in self.tide_sources}
+
+    def start_flood(self):
+        """Start the flood! Returns False (and does nothing) if a flood is already running or was lost"""
+        if self.flood_active or self.game_over:
+            return False
+        self.flood_active = True
+        self.flood_timer = 0
+        self.initial = False
+        self.rebuild_shadows()
+        # Fronts start next to the source edges (which are already tide)
+        self.flood = FloodEngine(self.grid, self.shadows, self.splash_pads)
+        return True
+
+    def barrier_state(self, i):
+        """Cell state of a barrier: green while selected, otherwise grey (strong) or brown (weak)"""
+        barrier_x, barrier_y, barrier_width, barrier_height, is_weak, is_active = self.barriers[i]
+        if is_active:
+            return 12 if is_weak else 4  # Green for active
+        return 11 if is_weak else 3  # Brown/grey for inactive
+
+    def move_selected_barrier(self, dx, dy):
+        """Move the selected barrier by one step if the new position is valid.
+
+        Only the cells the barrier enters are checked and only the cells it enters or leaves are
+        redrawn, so a move costs one edge strip instead of the whole rectangle.
+        """
+        i = self.selected_barrier
+        barrier = self.barriers[i]
+        barrier_x, barrier_y, barrier_width, barrier_height, is_weak, is_active = barrier
+        new_x, new_y = barrier_x + dx, barrier_y + dy
+        old_rect = (barrier_x, barrier_y, barrier_width, barrier_height)
+        new_rect = (new_x, new_y, barrier_width, barrier_height)
+        entered = rect_difference(new_rect, old_rect)
+        if not all(is_valid_position(self.grid, *strip) for strip in entered):
+            return False
+
+        # Move barrier and only this barrier's shadow
+        self.initial = False
+        self.barriers[i] = (new_x, new_y, barrier_width, barrier_height, is_weak, True)
+        for strip in rect_difference(old_rect, new_rect):
+            remove_barrier(self.grid, *strip)
+            for x, y, owner in self.index.remove(i, *strip):
+                if owner is not None:
+                    # Uncover the barrier under this one
+                    self.grid.fill_rect(x, y, 1, 1, self.barrier_state(owner))
+        for strip in entered:
+            self.index.add(i, *strip)
+            place_barrier(self.grid, *strip, 12 if is_weak else 4)  # Green for active
+        with self.profiler.phase('shadows'):
+            for shadow in self.shadows.values():
+                shadow.move(barrier, self.barriers[i])
+            if self.heatmap is not None:
+                self.heatmap.move(i, self.barriers[i])
+        return True
+
+    def set_barrier_active(self, i, is_active):
+        """Select or deselect a barrier and redraw it (on top of any barrier it overlaps)"""
+        barrier_x, barrier_y, barrier_width, barrier_height, is_weak = self.barriers[i][:5]
+        self.barriers[i] = (barrier_x, barrier_y, barrier_width, barrier_height, is_weak, is_active)
+        self.initial = False
+        self.index.raise_to_top(i, barrier_x, barrier_y, barrier_width, barrier_height)
+        place_barrier(self.grid, barrier_x, barrier_y, barrier_width, barrier_height, self.barrier_state(i))
+
+    def placement_hints(self):
+        """PlacementHeatmap with the hints for the selected barrier, or None when no barrier is
+        selected or the grid is not a (NumPy) Grid"""
+        if self.selected_barrier is None or not isinstance(self.grid, Grid):
+            return None
+        with self.profiler.phase('shadows'):
+            if self.heatmap is None:
+                self.heatmap = PlacementHeatmap(self.grid, self.barriers, self.priority_zones, self.tide_sources)
+            if self.heatmap.selected != self.selected_barrier:
+                self.heatmap.select(self.grid, self.selected_barrier)
+        return self.heatmap
+
+    def click(self, grid_x, grid_y):
+        """Select (or deselect) the barrier under a grid cell"""
+        i = self.index.at(grid_x, grid_y)
+        if i is None:
+            return None
+        if self.selected_barrier == i:
+            # Deactivate barrier
+            self.selected_barrier = None
+            self.set_barrier_active(i, False)
+        else:
+            # Activate this barrier, deactivate the previously selected one (the only other active one)
+            if self.selected_barrier is not None:
+                self.set_barrier_active(self.selected_barrier, False)
+            self.selected_barrier = i
+            self.set_barrier_active(i, True)
+        return i
+
+    def update(self, dt):
+        """Advance the simulation by dt seconds of real time (scaled by time_scale); return the flood ticks applied.
+
+        Leftover time carries over to the next update, so the flood keeps the same pace at any frame rate,
+        and several ticks are applied in one update when a frame takes longer than a tick.
+        """
+        ticks = 0
+        if not self.flood_active or self.game_over:
+            return ticks
+        if self.time_scale == INSTANT:
+            # Run the rest of the flood now
+            while self.flood_active and not self.game_over:
+                self.step()
+                ticks += 1
+            return ticks
+        self.flood_timer += dt * self.time_scale
+        while self.flood_active and not self.game_over and self.flood_timer >= self.flood_speed:
+            self.flood_timer -= self.flood_speed
+            self.step()
+            ticks += 1
+        return ticks
+
+    def step(self):
+        """Advance the flood by one tick, then check for a wet priority zone or the end of the level"""
+        if not self.flood_active or self.game_over:
+            return
+        # Flood normally, but exclude shadow areas
+        if self.flood.step():
+            # Check if priority zone got wet
+            with self.profiler.phase('priority'):
+                wet = check_priority_wet(self.grid, self.priority_zones)
+            if wet:
+                self.game_over = True
+                mark_priority_wet(self.grid, self.priority_zones)
+                self.flood_active = False
+        else:
+            # Flood complete, priority stayed dry
+            self.flood_active = False
+            self.complete_level()
+
+    def complete_level(self):
+        """Move on to the next level"""
+        self.level_complete = True
+        if self.current_level + 1 <= self.total_levels:
+            self.load_level(self.current_level + 1)
+        else:
+            self.current_level += 1
+            self.caption = f"Stem the Tide — Level {self.current_level} Complete! Press ESC to exit."
+
+    def predict(self):
+        """Predict the outcome of the flood for the current barrier layout (see predict_flood).
+
+        predict_flood needs a flat Grid, so a BitGrid or ChunkedGrid is copied to one first (with NumPy only).
+        """
+        if np is None:
+            raise ValueError("predicting a flood needs NumPy")
+        tick = self.flood.tick if self.flood_active else 0
+        if isinstance(self.grid, Grid):
+            grid = self.grid
+            shadows = {side: shadow.counts for side, shadow in self.shadows.items()}
+        else:
+            grid = Grid(self.grid.width, self.grid.height)
+            grid.cells[:] = np.frombuffer(self.grid.state_bytes(), dtype=np.uint8).reshape(self.grid.shape)
+            shadows = None  # Made again from the barriers
+        return predict_flood(grid, self.barriers, self.priority_zones, self.tide_sources, tick, shadows,
+                             self.splash_pads)
+
+    def run_to_completion(self):
+        """Run the flood to its end without real-time pacing; return True if the priority zones stayed dry"""
+        self.start_flood()
+        while self.flood_active and not self.game_over:
+            self.step()
+        return not self.game_over
+
+def grid_hash(grid):
+    """SHA-256 of a grid's cell states (the same for either backend)"""
+    return hashlib.sha256(grid.state_bytes()).hexdigest()
+
+def levels_hash(levels):
+    """SHA-256 of a list of level definitions, to tell which levels a recording was made on (for a LevelPack,
+    of the pack file, so its levels are not all decoded)"""
+    if isinstance(levels, LevelPack):
+        return levels.digest
+    digest = hashlib.sha256()
+    for level in levels:
+        digest.update(level_key(level).encode())
+    return digest.hexdigest()
+
+class InputRecorder:
+    """Applies inputs to a Simulation and records each one with its frame number, plus every frame's length.
+
+    Frame lengths are whole milliseconds (as clock.tick returns them), so a replay feeds the
+    simulation exactly the same dt values and ends in exactly the same state.
+    """
+
+    def __init__(self, sim):
+        self.sim = sim
+        self.frame = -1
+        self.frame_ms = []  # Length of each frame
+        self.inputs = []  # [frame, action, *args]
+
+    def begin_frame(self, ms):
+        """Start the next frame, ms milliseconds after the previous one"""
+        self.frame += 1
+        self.frame_ms.append(ms)
+
+    def apply_input(self, action, *args):
+        """Record an input on the current frame and apply it (see Simulation.apply_input)"""
+        self.inputs.append([self.frame, action, *args])
+        self.sim.apply_input(action, *args)
+
+    def save(self, path):
+        """Write the recording, with the hash of the grid at the end, as JSON"""
+        frame_ms = struct.pack(f'<{len(self.frame_ms)}H', *(min(ms, 0xFFFF) for ms in self.frame_ms))
+        record = {
+            'version': 1,
+            'levels': levels_hash(self.sim.levels),
+            'frame_ms': base64.b64encode(zlib.compress(frame_ms)).decode('ascii'),
+            'inputs': self.inputs,
+            'final_level': self.sim.current_level,
+            'final_hash': grid_hash(self.sim.grid),
+        }
+        with open(path, 'w') as f:
+            json.dump(record, f, separators=(',', ':'))
+
+def replay(record, levels=LEVELS, grid_class=None):
+    """Run a recording (dict as saved by InputRecorder) through a new Simulation as fast as possible; return it"""
+    if record['levels'] != levels_hash(levels):
+        raise ValueError("Recording was made on different levels")
+    frame_ms = zlib.decompress(base64.b64decode(record['frame_ms']))
+    sim = Simulation(current_level=1, levels=levels, grid_class=grid_class)
+    inputs = iter(record['inputs'])
+    pending = next(inputs, None)
+    for frame, ms in enumerate(struct.unpack(f'<{len(frame_ms) // 2}H', frame_ms)):
+        # Same order as main(): the frame's inputs, then the update
+        while pending is not None and pending[0] == frame:
+            sim.apply_input(*pending[1:])
+            pending = next(inputs, None)
+        sim.update(ms / 1000.0)
+    return sim
+
+def replay_file(path, levels=LEVELS):
+    """Replay a recording file; return (simulation, whether its final grid hash matches the recorded one)"""
+    with open(path) as f:
+        record = json.load(f)
+    sim = replay(record, levels)
+    return sim, grid_hash(sim.grid) == record['final_hash'] and sim.current_level == record['final_level']
+
+def barrier_positions(grid, width, height):
+    """Every (x, y) where a barrier of the given size is a valid position on the grid"""
+    return [(x, y)
+            for y in range(grid.height - height + 1)
+            for x in range(grid.width - width + 1)
+            if is_valid_position(grid, x, y, width, height)]
+
+def zone_shadowed(zone_rows, zone_cols, positions, width, height, is_weak, sources=('top',)):
+    """For each barrier position, whether its shadow covers each zone cell, as a (positions, sources * cells)
+    boolean array (the cells for the first source, then for the next one, ...)"""
+    positions = np.asarray(positions, dtype=np.intp).reshape(-1, 2)
+    covered = []
+    for side in sources:
+        footprint, (offset_y, offset_x) = oriented_footprint(width, height, is_weak, side)
+        # Zone cells relative to each position's footprint origin, shape (positions, cells)
+        rows = zone_rows[None, :] - (positions[:, 1:2] + offset_y)
+        cols = zone_cols[None, :] - (positions[:, 0:1] + offset_x)
+        inside = (rows >= 0) & (rows < footprint.shape[0]) & (cols >= 0) & (cols < footprint.shape[1])
+        if not footprint.size:
+            covered.append(inside)  # No shadow at all (inside is all False)
+            continue
+        covered.append(inside & footprint[np.where(inside, rows, 0), np.where(inside, cols, 0)])
+    return np.concatenate(covered, axis=1)
+
+def zone_coverage(zone_rows, zone_cols, positions, width, height, is_weak, sources=('top',)):
+    """For each barrier position, a bitmask (Python int) of the priority-zone cells its shadow covers.
+
+    With several tide sources there is one bit per zone cell per source, in the order of sources.
+    """
+    covered = zone_shadowed(zone_rows, zone_cols, positions, width, height, is_weak, sources)
+    packed = np.packbits(covered, axis=1, bitorder='little')
+    return [int.from_bytes(row.tobytes(), 'little') for row in packed]
+
+SolveResult = collections.namedtuple('SolveResult', ['count', 'solutions', 'best', 'best_moves'])
+
+# Per-process solver data, set once per worker by _init_solver
+_solver_state = None
+
+def _init_solver(state):
+    global _solver_state
+    _solver_state = state
+
+def _solve_chunk(task):
+    """Expand one winning combination of coverage masks into non-overlapping barrier layouts"""
+    sizes, groups, starts, find_all, splash = _solver_state
+    masks, first, last = task
+
+    # Grow layouts one barrier at a time, shape (layouts, barriers so far, 2)
+    layouts = groups[0][masks[0]][first:last, None, :]
+    for i in range(1, len(sizes)):
+        candidates = groups[i][masks[i]]
+        width, height = sizes[i]
+        ok = np.ones((len(layouts), len(candidates)), dtype=bool)
+        for j in range(i):
+            other_w, other_h = sizes[j]
+            other = layouts[:, j, None, :]
+            ok &= ~((other[..., 0] < candidates[None, :, 0] + width) &
+                    (candidates[None, :, 0] < other[..., 0] + other_w) &
+                    (other[..., 1] < candidates[None, :, 1] + height) &
+                    (candidates[None, :, 1] < other[..., 1] + other_h))
+        layout_idx, candidate_idx = np.nonzero(ok)
+        layouts = np.concatenate([layouts[layout_idx], candidates[candidate_idx, None, :]], axis=1)
+        if not len(layouts):
+            return 0, [], None, None
+
+    if splash is not None and not _splash_safe(masks, layouts[0]):
+        return 0, [], None, None
+
+    # Arrow presses needed from the starting positions (ignoring barriers blocking each other's path)
+    moves = np.abs(layouts - starts).sum(axis=(1, 2))
+    best = int(moves.argmin())
+    solutions = [tuple(map(tuple, layout.tolist())) for layout in layouts] if find_all else []
+    return len(layouts), solutions, tuple(map(tuple, layouts[best].tolist())), int(moves[best])
+
+def _splash_safe(masks, layout):
+    """Whether splashes stay out of the priority zones for a combination of coverage groups.
+
+    Every layout in the combination shadows the same pad cells and puts barrier cells in the
+    same places on the pads' lanes, so any one of them (layout) gives the answer; it is cached.
+    """
+    cache, cells, barriers, priority_zones, sources, splash_pads, pad_cells = _solver_state[4]
+    if masks not in cache:
+        grid = Grid(cells.shape[1], cells.shape[0])
+        grid.cells[:] = cells
+        for (x, y), barrier in zip(layout.tolist(), barriers):
+            place_barrier(grid, x, y, barrier[2], barrier[3], 11 if barrier[4] else 3)
+
+        # A pad is hit from a side unless every one of its cells is shadowed from that side
+        covered = 0
+        for zone_mask, pad_mask, lane_cells in masks:
+            covered |= pad_mask
+        hits = []
+        for s, side in enumerate(sources):
+            first = s * len(pad_cells)
+            for pad, (pad_x, pad_y, pad_size) in enumerate(splash_pads):
+                bits = ((1 << (pad_size * pad_size)) - 1) << first
+                if covered & bits != bits:
+                    hits.append((pad, side))
+                first += pad_size * pad_size
+
+        arrival = splash_arrival_ticks(grid, splash_pads, {1: hits})
+        cache[masks] = not any((arrival[zone_y:zone_y + zone_size, zone_x:zone_x + zone_size]
+                                != np.iinfo(np.int32).max).any()
+                               for zone_x, zone_y, zone_size in priority_zones)
+    return cache[masks]
+
+def solve_barriers(grid, barriers, priority_zones, sources=('top',), find_all=False, workers=None, chunk_size=64,
+                   splash_pads=()):
+    """Find every placement of the barriers that keeps all priority zones dry.
+
+    grid is the level without its barriers; barriers holds them at their starting positions.
+    Each barrier's valid positions are grouped by which zone cells their shadows (one per tide
+    source) cover, so combinations that cannot shadow every zone cell from every source are
+    pruned before any position is expanded. The surviving combinations are spread over a
+    process pool (workers=1 runs in-process). With splash pads, positions are also grouped by
+    which pad cells they shadow and which cells of the pads' lanes they occupy, and one
+    splash replay per combination of groups decides whether splashes reach a zone.
+    Returns a SolveResult with the number of winning layouts, the layouts themselves if
+    find_all, and the layout needing the fewest arrow presses from the starting positions.
+    """
+    # Zone cells as bits of a coverage mask
+    zone_rows, zone_cols = [], []
+    for zone_x, zone_y, zone_size in priority_zones:
+        rows, cols = np.mgrid[zone_y:zone_y + zone_size, zone_x:zone_x + zone_size]
+        zone_rows.extend(rows.ravel())
+        zone_cols.extend(cols.ravel())
+    zone_rows, zone_cols = np.array(zone_rows), np.array(zone_cols)
+    full = (1 << (len(zone_rows) * len(sources))) - 1
+
+    # Pad cells, and the rows and columns splashes can run along
+    pad_rows, pad_cols = [], []
+    lanes = np.zeros(grid.cells.shape, dtype=bool)
+    for pad_x, pad_y, pad_size in splash_pads:
+        rows, cols = np.mgrid[pad_y:pad_y + pad_size, pad_x:pad_x + pad_size]
+        pad_rows.extend(rows.ravel())
+        pad_cols.extend(cols.ravel())
+        lanes[pad_y:pad_y + pad_size, :] = True
+        lanes[:, pad_x:pad_x + pad_size] = True
+    pad_rows, pad_cols = np.array(pad_rows, dtype=np.intp), np.array(pad_cols, dtype=np.intp)
+
+    # Group each barrier's valid positions by the zone cells they shadow (and, with splash
+    # pads, the pad cells they shadow and the lane cells they occupy)
+    sizes, groups = [], []
+    for barrier_x, barrier_y, barrier_width, barrier_height, is_weak, is_active in barriers:
+        positions = barrier_positions(grid, barrier_width, barrier_height)
+        zone_masks = zone_coverage(zone_rows, zone_cols, positions, barrier_width, barrier_height, is_weak, sources)
+        if splash_pads:
+            pad_masks = zone_coverage(pad_rows, pad_cols, positions, barrier_width, barrier_height, is_weak, sources)
+        else:
+            pad_masks = [0] * len(positions)
+        by_mask = {}
+        for (x, y), zone_mask, pad_mask in zip(positions, zone_masks, pad_masks):
+            lane_cells = ()
+            if splash_pads:
+                rows, cols = np.nonzero(lanes[y:y + barrier_height, x:x + barrier_width])
+                lane_cells = tuple(((rows + y) * grid.width + cols + x).tolist())
+            by_mask.setdefault((zone_mask, pad_mask, lane_cells), []).append((x, y))
+        sizes.append((barrier_width, barrier_height))
+        groups.append({mask: np.array(group, dtype=np.intp) for mask, group in by_mask.items()})
+
+    # Zone coverage still reachable by barriers i and later, for pruning
+    reach = [0] * (len(groups) + 1)
+    for i in range(len(groups) - 1, -1, -1):
+        reach[i] = reach[i + 1]
+        for zone_mask, pad_mask, lane_cells in groups[i]:
+            reach[i] |= zone_mask
+
+    def winning_masks(i, covered):
+        if i == len(groups):
+            yield ()
+            return
+        for mask in groups[i]:
+            if (covered | mask[0] | reach[i + 1]) == full:
+                for rest in winning_masks(i + 1, covered | mask[0]):
+                    yield (mask,) + rest
+
+    tasks = []
+    if groups:
+        for masks in winning_masks(0, 0):
+            for first in range(0, len(groups[0][masks[0]]), chunk_size):
+                tasks.append((masks, first, first + chunk_size))
+
+    starts = np.array([barrier[:2] for barrier in barriers], dtype=np.intp)
+    splash = None
+    if splash_pads:
+        splash = ({}, grid.cells, barriers, priority_zones, sources, splash_pads, pad_rows)
+    state = (sizes, groups, starts, find_all, splash)
+    if workers == 1 or len(tasks) <= 1:
+        _init_solver(state)
+        results = map(_solve_chunk, tasks)
+    else:
+        executor = concurrent.futures.ProcessPoolExecutor(workers, initializer=_init_solver, initargs=(state,))
+        results = executor.map(_solve_chunk, tasks, chunksize=max(1, len(tasks) // (4 * (workers or os.cpu_count() or 1))))
+
+    count, solutions, best, best_moves = 0, [], None, None
+    try:
+        for chunk_count, chunk_solutions, chunk_best, chunk_moves in results:
+            count += chunk_count
+            solutions.extend(chunk_solutions)
+            if chunk_best is not None and (best_moves is None or chunk_moves < best_moves):
+                best, best_moves = chunk_best, chunk_moves
+    finally:
+        if workers != 1 and len(tasks) > 1:
+            executor.shutdown()
+    return SolveResult(count, solutions, best, best_moves)
+
+def level_problem(level):
+    """A level (built-in level number or level definition) as (grid without barriers, barriers at their
+    starting positions, priority zones, tide sides, splash pads), the arguments of solve_barriers"""
+    if isinstance(level, int):
+        level = LEVELS[level - 1]
+    grid = Grid(level['width'], level['height'])
+    priority_zones = setup_level(grid, level, 1, 1)
+    barriers = [(barrier_x, barrier_y, barrier_width, barrier_height, bool(is_weak), False)
+                for barrier_x, barrier_y, barrier_width, barrier_height, is_weak in level['barriers']]
+    return (grid, barriers, priority_zones, resolve_tide_sources(level['tide']),
+            [tuple(pad) for pad in level.get('splash_pads', [])])
+
+def solve_level(level, find_all=False, workers=None):
+    """Check that a level (built-in level number or level definition) is solvable and count its
+    winning barrier layouts (see solve_barriers)"""
+    grid, barriers, priority_zones, sources, splash_pads = level_problem(level)
+    return solve_barriers(grid, barriers, priority_zones, sources, find_all, workers, splash_pads=splash_pads)
+
+def zone_cells(priority_zones):
+    """Rows, columns and zone numbers of every priority-zone cell, as three arrays"""
+    zone_rows, zone_cols, zone_ids = [], [], []
+    for zone, (zone_x, zone_y, zone_size) in enumerate(priority_zones):
+        rows, cols = np.mgrid[zone_y:zone_y + zone_size, zone_x:zone_x + zone_size]
+        zone_rows.extend(rows.ravel())
+        zone_cols.extend(cols.ravel())
+        zone_ids.extend([zone] * zone_size * zone_size)
+    return (np.array(zone_rows, dtype=np.intp), np.array(zone_cols, dtype=np.intp),
+            np.array(zone_ids, dtype=np.intp))
+
+def layouts_valid(grid, barriers, positions):
+    """For an (N, len(barriers), 2) array of barrier (x, y) positions, whether each layout puts every
+    barrier on a valid position of the grid (the level without its barriers), as N booleans"""
+    positions = np.asarray(positions, dtype=np.intp)
+    # Number of cells a barrier may not cover in each rectangle, from a summed-area table
+    blocked = np.zeros((grid.height + 1, grid.width + 1), dtype=np.int32)
+    blocked[1:, 1:] = (~PASSABLE_STATES[grid.cells]).cumsum(axis=0).cumsum(axis=1)
+    valid = np.ones(len(positions), dtype=bool)
+    for i, (barrier_x, barrier_y, barrier_width, barrier_height, is_weak, is_active) in enumerate(barriers):
+        x, y = positions[:, i, 0], positions[:, i, 1]
+        inside = (x >= 0) & (y >= 0) & (x + barrier_width <= grid.width) & (y + barrier_height <= grid.height)
+        x, y = np.where(inside, x, 0), np.where(inside, y, 0)
+        right, bottom = np.minimum(x + barrier_width, grid.width), np.minimum(y + barrier_height, grid.height)
+        count = blocked[bottom, right] - blocked[y, right] - blocked[bottom, x] + blocked[y, x]
+        valid &= inside & (count == 0)
+    return valid
+
+def evaluate_layouts(grid, barriers, priority_zones, positions, sources=('top',), splash_pads=()):
+    """Which priority zones the flood wets for each of many barrier layouts, all at once.
+
+    grid is the level without its barriers and positions an (N, len(barriers), 2) array of
+    barrier (x, y) positions. Returns an (N, len(priority_zones)) boolean array, True where the
+    zone gets wet if the flood runs to its end. Only the zone cells' rows of the stacked shadow
+    masks are built: a zone stays dry when some barrier's shadow covers each of its cells from
+    every tide side, because the fronts flood every unshadowed cell they cross. With splash pads
+    each layout is predicted on its own (predict_flood), which is far slower. Positions are not
+    checked (see layouts_valid).
+    """
+    positions = np.asarray(positions, dtype=np.intp)
+    wet = np.zeros((len(positions), len(priority_zones)), dtype=bool)
+    if splash_pads:
+        # Splashes depend on where every barrier is: predict each layout
+        trial = Grid(grid.width, grid.height)
+        for n, layout in enumerate(positions.tolist()):
+            trial.cells[:] = grid.cells
+            placed = []
+            for (x, y), (barrier_x, barrier_y, barrier_width, barrier_height, is_weak, is_active) in zip(layout,
+                                                                                                       barriers):
+                place_barrier(trial, x, y, barrier_width, barrier_height, 11 if is_weak else 3)
+                placed.append((x, y, barrier_width, barrier_height, is_weak, False))
+            wet[n] = predict_flood(trial, placed, priority_zones, sources, splash_pads=splash_pads).zone_wet
+        return wet
+
+    zone_rows, zone_cols, zone_ids = zone_cells(priority_zones)
+
+    # Shadowed zone cells per layout and tide side, OR-ed over the barriers
+    shadowed = np.zeros((len(positions), len(sources) * len(zone_rows)), dtype=bool)
+    for i, (barrier_x, barrier_y, barrier_width, barrier_height, is_weak, is_active) in enumerate(barriers):
+        shadowed |= zone_shadowed(zone_rows, zone_cols, positions[:, i], barrier_width, barrier_height, is_weak,
+                                  sources)
+    # A cell gets wet unless it is shadowed from every side; a zone gets wet if any of its cells does
+    cell_wet = ~shadowed.reshape(len(positions), len(sources), len(zone_rows)).all(axis=1)
+    for zone in range(len(priority_zones)):
+        wet[:, zone] = cell_wet[:, zone_ids == zone].any(axis=1)
+    return wet
+
+def evaluate_level(level, positions):
+    """evaluate_layouts for a level (built-in level number or level definition)"""
+    grid, barriers, priority_zones, sources, splash_pads = level_problem(level)
+    return evaluate_layouts(grid, barriers, priority_zones, positions, sources, splash_pads)
+
+class PlacementHeatmap:
+    """Which priority zones each barrier would keep dry at every position it could go, with the
+    other barriers where they are now.
+
+    A shadow is a fixed footprint translated to the barrier's position, so the positions whose
+    shadow covers a zone cell are the footprint, flipped, around that cell: adding the flipped
+    footprint for every zone cell no other barrier shadows (an exposed cell) counts, per position,
+    the exposed cells the barrier would cover, a correlation of the exposed cells with the
+    footprint. A zone stays dry at the positions covering all its exposed cells from every tide
+    side. How many barriers shadow each zone cell is kept up to date as barriers move, and the
+    counts of each barrier are kept from one selection to the next, so selecting a barrier again
+    only adds or takes away the footprints of the cells whose exposure changed in between. Splash
+    pads are not taken into account.
+    """
+
+    def __init__(self, grid, barriers, priority_zones, sources=('top',)):
+        self.shape = grid.shape
+        self.sources = tuple(sources)
+        self.zone_count = len(priority_zones)
+        self.zone_rows, self.zone_cols, self.zone_ids = zone_cells(priority_zones)
+        self.barriers = list(barriers)  # Positions the coverage counts are for
+        # Number of barrier shadows on each zone cell, per tide side
+        self.coverage = np.zeros((len(self.sources), len(self.zone_rows)), dtype=np.int16)
+        for barrier in self.barriers:
+            self.coverage += self._covers(barrier)
+        self.counts = {}  # Barrier index -> (covered exposed cells per side, zone and position; exposed cells)
+        self.selected = None  # Barrier the hints below are for
+        self.dry = None  # (zones, rows, cols) booleans: zone kept dry with the barrier's top left at (col, row)
+        self.kept = None  # Number of zones kept dry at each position
+        self.valid = None  # Positions the barrier can go
+
+    def _covers(self, barrier):
+        """Zone cells a barrier's shadow covers, as a (sides, cells) 0/1 array"""
+        barrier_x, barrier_y, barrier_width, barrier_height, is_weak = barrier[:5]
+        covered = zone_shadowed(self.zone_rows, self.zone_cols, [(barrier_x, barrier_y)], barrier_width,
+                                barrier_height, is_weak, self.sources)
+        return covered.reshape(len(self.sources), -1).astype(np.int16)
+
+    def move(self, i, barrier):
+        """Record a barrier's new position (barrier tuple as stored in the barriers list)"""
+        self.coverage -= self._covers(self.barriers[i])
+        self.barriers[i] = barrier
+        self.coverage += self._covers(barrier)
+
+    def _scatter(self, hits, barrier, side, cell, sign):
+        """Add (or take away) the flipped footprint around one zone cell to the per-position counts"""
+        barrier_x, barrier_y, barrier_width, barrier_height, is_weak = barrier[:5]
+        footprint, (offset_y, offset_x) = oriented_footprint(barrier_width, barrier_height, is_weak,
+                                                             self.sources[side])
+        positions_h, positions_w = hits.shape[2:]
+        # Positions whose footprint covers the cell, footprint row/col 0 landing on the far corner
+        top = self.zone_rows[cell] - offset_y - footprint.shape[0] + 1
+        left = self.zone_cols[cell] - offset_x - footprint.shape[1] + 1
+        first_row, last_row = max(0, top), min(positions_h, top + footprint.shape[0])
+        first_col, last_col = max(0, left), min(positions_w, left + footprint.shape[1])
+        if first_row >= last_row or first_col >= last_col:
+            return
+        flipped = footprint[::-1, ::-1][first_row - top:last_row - top, first_col - left:last_col - left]
+        window = hits[side, self.zone_ids[cell], first_row:last_row, first_col:last_col]
+        if sign > 0:
+            window += flipped
+        else:
+            window -= flipped
+
+    def select(self, grid, i):
+        """Work out the hints for barrier i on the grid it is placed on"""
+        barrier = self.barriers[i]
+        barrier_x, barrier_y, barrier_width, barrier_height, is_weak = barrier[:5]
+        grid_h, grid_w = self.shape
+        positions_h, positions_w = max(0, grid_h - barrier_height + 1), max(0, grid_w - barrier_width + 1)
+        if i not in self.counts:
+            self.counts[i] = (np.zeros((len(self.sources), self.zone_count, positions_h, positions_w), dtype=np.int16),
+                              np.zeros(self.coverage.shape, dtype=bool))
+        hits, exposed = self.counts[i]
+
+        # Cells no other barrier shadows now; only those that changed since the last selection are redone
+        now_exposed = (self.coverage - self._covers(barrier)) == 0
+        for side, cell in zip(*np.nonzero(now_exposed != exposed)):
+            self._scatter(hits, barrier, side, cell, 1 if now_exposed[side, cell] else -1)
+        exposed[:] = now_exposed
+
+        # A zone is dry where the barrier covers all of its exposed cells from every side
+        needed = np.zeros((len(self.sources), self.zone_count), dtype=np.int16)
+        for side in range(len(self.sources)):
+            needed[side] = np.bincount(self.zone_ids[exposed[side]], minlength=self.zone_count)
+        self.dry = (hits == needed[:, :, None, None]).all(axis=0)
+        self.kept = self.dry.sum(axis=0)
+
+        # Valid positions from a summed-area table of the cells it may not cover (its own cells it may)
+        blocked = ~PASSABLE_STATES[grid.cells]
+        blocked[barrier_y:barrier_y + barrier_height, barrier_x:barrier_x + barrier_width] = False
+        table = np.zeros((grid_h + 1, grid_w + 1), dtype=np.int32)
+        table[1:, 1:] = blocked.cumsum(axis=0).cumsum(axis=1)
+        count = (table[barrier_height:, barrier_width:] - table[:positions_h, barrier_width:]
+                 - table[barrier_height:, :positions_w] + table[:positions_h, :positions_w])
+        self.valid = count == 0
+        self.selected = i
+
+def placement_tint(heatmap, rect):
+    """RGBA tint for the cells of a viewport rect (x, y, width, height), marking each valid position of the
+    selected barrier at its top left cell: HINT_DRY where it keeps every priority zone dry, HINT_SOME where
+    only some, HINT_WET where none"""
+    x, y, width, height = rect
+    tint = np.zeros((height, width, 4), dtype=np.uint8)
+    kept = heatmap.kept[y:y + height, x:x + width]
+    valid = heatmap.valid[y:y + height, x:x + width]
+    colors = np.array([HINT_WET, HINT_SOME, HINT_DRY], dtype=np.uint8)
+    rows, cols = kept.shape
+    tint[:rows, :cols, :3] = colors[np.where(kept == heatmap.zone_count, 2, kept > 0)]
+    tint[:rows, :cols, 3] = np.where(valid, HINT_ALPHA, 0)
+    return tint
+
+def dirty_rects(previous, cells):
+    """Rectangles (x, y, width, height in cells) covering every cell that differs between two grids.
+
+    Consecutive changed rows are merged into one band, trimmed to the changed columns.
+    """
+    changed = previous != cells
+    rows = np.flatnonzero(changed.any(axis=1))
+    if not len(rows):
+        return []
+    # Split changed rows into runs of consecutive rows
+    breaks = np.flatnonzero(np.diff(rows) > 1) + 1
+    rects = []
+    for run in np.split(rows, breaks):
+        top, bottom = int(run[0]), int(run[-1]) + 1
+        cols = np.flatnonzero(changed[top:bottom].any(axis=0))
+        rects.append((int(cols[0]), top, int(cols[-1]) + 1 - int(cols[0]), bottom - top))
+    return rects
+
+class Renderer:
+    """Draws the state grid through the PALETTE lookup table, redrawing only the cells that changed"""
+
+    def __init__(self, screen, grid_w, grid_h, pixel_size=PIXEL_SIZE):
+        load_pygame()
+        self.screen = screen
+        self.pixel_size = pixel_size
+        self.cells_surface = pygame.Surface((grid_w, grid_h))  # One pixel per cell
+        self.previous = None
+        self.drew_grid = None
+        self.overlay_rect = None  # Screen rect covered by last frame's overlay
+        self.tint = None  # Tint blended over last frame's cells
+
+        # Pre-render the grid lines once
+        self.grid_overlay = pygame.Surface((grid_w * pixel_size, grid_h * pixel_size))
+        self.grid_overlay.set_colorkey((0, 0, 0))
+        for cx in range(0, grid_w * pixel_size, pixel_size):
+            pygame.draw.line(self.grid_overlay, GRID_COLOR, (cx, 0), (cx, grid_h * pixel_size), 1)
+        for cy in range(0, grid_h * pixel_size, pixel_size):
+            pygame.draw.line(self.grid_overlay, GRID_COLOR, (0, cy), (grid_w * pixel_size, cy), 1)
+
+    def invalidate(self):
+        """Force a full redraw on the next frame"""
+        self.previous = None
+
+    def draw(self, cells, draw_grid=False, overlay=None, tint=None, colors=None):
+        """Draw the cells that changed since the last frame (and an optional overlay surface on top),
+        pushing only those rects to the display. tint is an optional (rows, cols, 4) RGBA array blended
+        over the cells; passing a different array redraws everything. colors, if given, are the cells
+        already mapped through PALETTE (rows, cols, RGB), such as a level's cached initial colors."""
+        size = self.pixel_size
+        margins = []  # Screen outside the cells, cleared on a full redraw
+        if (self.previous is None or self.previous.shape != cells.shape or draw_grid != self.drew_grid
+                or tint is not self.tint):
+            rects = [(0, 0, cells.shape[1], cells.shape[0])]
+            # A board smaller than the window (e.g. after zooming out) leaves the last frame around it
+            screen_w, screen_h = self.screen.get_size()
+            drawn_w, drawn_h = cells.shape[1] * size, cells.shape[0] * size
+            if drawn_w < screen_w:
+                margins.append(pygame.Rect(drawn_w, 0, screen_w - drawn_w, screen_h))
+            if drawn_h < screen_h:
+                margins.append(pygame.Rect(0, drawn_h, min(drawn_w, screen_w), screen_h - drawn_h))
+        else:
+            rects = dirty_rects(self.previous, cells)
+        self.previous = cells.copy()
+        self.drew_grid = draw_grid
+        self.tint = tint
+        if self.overlay_rect is not None:
+            # Uncover the cells under the previous overlay
+            covered = self.overlay_rect
+            x, y = covered.left // size, covered.top // size
+            rects.append((x, y, min(cells.shape[1], -(-covered.right // size)) - x,
+                          min(cells.shape[0], -(-covered.bottom // size)) - y))
+            self.overlay_rect = None
+        if not rects and overlay is None:
+            return
+
+        # Map states to colors in one blit, then scale the changed parts up to PIXEL_SIZE
+        colors = PALETTE[cells.T] if colors is None else colors.transpose(1, 0, 2)
+        if tint is not None:
+            alpha = tint[:, :, 3:].transpose(1, 0, 2).astype(np.uint16)
+            colors = ((colors * (255 - alpha) + tint[:, :, :3].transpose(1, 0, 2) * alpha) // 255).astype(np.uint8)
+        pygame.surfarray.blit_array(self.cells_surface, colors)
+        screen_rects = []
+        for x, y, width, height in rects:
+            screen_rect = pygame.Rect(x * size, y * size, width * size, height * size)
+            area = self.cells_surface.subsurface((x, y, width, height))
+            self.screen.blit(pygame.transform.scale(area, screen_rect.size), screen_rect)
+            if draw_grid:
+                self.screen.blit(self.grid_overlay, screen_rect, screen_rect)
+            screen_rects.append(screen_rect)
+        for margin in margins:
+            self.screen.fill(STATES[0], margin)
+            screen_rects.append(margin)
+        if overlay is not None:
+            # Top left, below the level indicators
+            self.overlay_rect = self.screen.blit(overlay, (3 * size, 3 * size)).clip(self.screen.get_rect())
+            screen_rects.append(self.overlay_rect)
+        pygame.display.update(screen_rects)
+
+class BitRenderer(Renderer):
+    """Draws a BitGrid without NumPy: one fill per run of set bits in each layer of the rows that changed"""
+
+    def draw(self, grid, draw_grid=False, overlay=None, tint=None, colors=None):
+        """Draw the rows that changed since the last frame (and an optional overlay surface on top),
+        pushing only those rows to the display (tint and colors need NumPy, so they are ignored)"""
+        size = self.pixel_size
+        # A row is unchanged when every layer has the same bits in it
+        layers = sorted(grid.layers.items())
+        signatures = [tuple((state, rows[y]) for state, rows in layers if rows[y]) for y in range(grid.height)]
+        if self.previous is None or len(self.previous) != grid.height or draw_grid != self.drew_grid:
+            changed = set(range(grid.height))
+        else:
+            changed = {y for y, (old, new) in enumerate(zip(self.previous, signatures)) if old != new}
+        self.previous = signatures
+        self.drew_grid = draw_grid
+        if self.overlay_rect is not None:
+            # Uncover the rows under the previous overlay
+            changed.update(range(self.overlay_rect.top // size, min(grid.height, -(-self.overlay_rect.bottom // size))))
+            self.overlay_rect = None
+        if not changed and overlay is None:
+            return
+
+        screen_rects = []
+        for y in sorted(changed):
+            row_rect = pygame.Rect(0, y * size, grid.width * size, size)
+            self.screen.fill(get_color_for_state(0), row_rect)
+            for state, bits in signatures[y]:
+                color = get_color_for_state(state)
+                for x, run in bit_runs(bits):
+                    self.screen.fill(color, (x * size, y * size, run * size, size))
+            if draw_grid:
+                self.screen.blit(self.grid_overlay, row_rect, row_rect)
+            if screen_rects and screen_rects[-1].bottom == row_rect.top:
+                screen_rects[-1].union_ip(row_rect)  # Merge consecutive rows
+            else:
+                screen_rects.append(row_rect)
+        if overlay is not None:
+            # Top left, below the level indicators
+            self.overlay_rect = self.screen.blit(overlay, (3 * size, 3 * size)).clip(self.screen.get_rect())
+            screen_rects.append(self.overlay_rect)
+        pygame.display.update(screen_rects)
+
+class Viewport:
+    """The part of the grid shown in the window: the top-left cell shown and the pixels per cell (zoom)"""
+
+    def __init__(self, grid_w, grid_h, window_w, window_h, zoom=PIXEL_SIZE):
+        self.grid_w, self.grid_h = grid_w, grid_h
+        self.window_w, self.window_h = window_w, window_h
+        self.zoom = zoom
+        self.x, self.y = 0, 0
+        self.clamp()
+
+    @property
+    def rect(self):
+        """Cells shown (x, y, width, height), including the partly shown ones at the right and bottom"""
+        width = min(self.grid_w, -(-self.window_w // self.zoom))
+        height = min(self.grid_h, -(-self.window_h // self.zoom))
+        return self.x, self.y, width, height
+
+    def clamp(self):
+        """Keep the shown cells inside the grid"""
+        x, y, width, height = self.rect
+        self.x = clamp(self.x, 0, self.grid_w - width)
+        self.y = clamp(self.y, 0, self.grid_h - height)
+
+    def scroll(self, dx, dy):
+        """Move the view by a number of cells"""
+        self.x += dx
+        self.y += dy
+        self.clamp()
+
+    def zoom_by(self, step, anchor=(0, 0)):
+        """Step through ZOOM_LEVELS, keeping the cell under the anchor pixel in place"""
+        levels = sorted(set(ZOOM_LEVELS) | {self.zoom})
+        zoom = levels[clamp(levels.index(self.zoom) + step, 0, len(levels) - 1)]
+        cell_x, cell_y = self.to_grid(*anchor)
+        self.zoom = zoom
+        self.x, self.y = cell_x - anchor[0] // zoom, cell_y - anchor[1] // zoom
+        self.clamp()
+
+    def to_grid(self, pixel_x, pixel_y):
+        """Grid cell under a window pixel"""
+        return self.x + pixel_x // self.zoom, self.y + pixel_y // self.zoom
+
+def open_window(grid_shape):
+    """Window for a grid (the grid's size at PIXEL_SIZE, up to MAX_WIN_W x MAX_WIN_H) and a viewport into it"""
+    load_pygame()
+    grid_h, grid_w = grid_shape
+    window_w, window_h = min(grid_w * PIXEL_SIZE, MAX_WIN_W), min(grid_h * PIXEL_SIZE, MAX_WIN_H)
+    screen = pygame.display.set_mode((window_w, window_h))
+    return screen, Viewport(grid_w, grid_h, window_w, window_h)
+
+def profile_overlay(font, percentiles):
+    """Surface listing the p50/p99 milliseconds of each profiled phase"""
+    load_pygame()
+    lines = [f"{'phase':<9}{'p50 ms':>8}{'p99 ms':>8}"]
+    lines += [f"{name:<9}{p50:8.2f}{p99:8.2f}" for name, (p50, p99) in percentiles.items()]
+    rendered = [font.render(line, True, (255, 255, 255)) for line in lines]
+    line_height = font.get_linesize()
+    surface = pygame.Surface((max(text.get_width() for text in rendered) + 8, line_height * len(lines) + 8))
+    surface.fill((0, 0, 0))
+    for i, text in enumerate(rendered):
+        surface.blit(text, (4, 4 + i * line_height))
+    surface.set_alpha(200)
+    return surface
 
 def main():
+    parser = argparse.ArgumentParser(description="Stem the Tide")
+    parser.add_argument('level_pack', nargs='?', help="level pack to play instead of the built-in levels")
+    parser.add_argument('--profile', metavar='PATH',
+                        help="record frame timings and write them to PATH on exit (.csv, otherwise a Chrome trace)")
+    parser.add_argument('--record', metavar='PATH', help="record every input to PATH, for --replay")
+    parser.add_argument('--replay', metavar='PATH', nargs='+',
+                        help="replay recordings headless (no window, no frame pacing) and check their final grids")
+    args = parser.parse_args()
+    if args.profile and np is None:
+        parser.error("--profile needs NumPy")
+
+    # Levels from a level pack given on the command line, or the built-in ones
+    levels = LevelPack(args.level_pack) if args.level_pack else LEVELS
+
+    if args.replay:
+        mismatches = 0
+        for path in args.replay:
+            sim, matches = replay_file(path, levels)
+            mismatches += not matches
+            outcome = "lost" if sim.game_over else "in progress" if sim.flood_active else "stopped"
+            print(f"{path}: level {sim.current_level}, {outcome}, {'ok' if matches else 'MISMATCH'}")
+        sys.exit(1 if mismatches else 0)
+    profiler = FrameProfiler(enabled=bool(args.profile))
+    show_profile = False
+    overlay = None
+    font = None
+    overlay_frame = 0  # Frame count the overlay was last refreshed at
+    show_hints = False
+    tint = None
+    tint_for = None  # Heatmap, barrier and viewport rect the tint was made for
+
+    load_pygame()
     pygame.init()
-    screen = pygame.display.set_mode((WIN_W, WIN_H))
-    pygame.display.set_caption("Stem the Tide — Level 1: Press SPACE to start the flood!")
     clock = pygame.time.Clock()
+    arrow_moves = {pygame.K_UP: (0, -1), pygame.K_DOWN: (0, 1), pygame.K_LEFT: (-1, 0), pygame.K_RIGHT: (1, 0)}
 
     # Game state
-    current_level = 1
-    total_levels = 8
-    flood_active = False
-    flood_row = 0
-    flood_speed = 0.1  # seconds per row
-    flood_timer = 0
-    flood_shadow_mask = set()  # Cells to exclude from flooding
-    game_over = False
-    level_complete = False
-    
-    # Barrier state
-    barriers = []  # List of (x, y, width, height, is_weak, is_active)
-    selected_barrier = None  # Index of currently selected barrier
-    
-    # Create a 2D grid to track states
-    grid = [[0 for _ in range(GRID_W)] for _ in range(GRID_H)]
-    
-    # Setup initial level
-    priority_zones = setup_level_1(grid)
-    
-    # Add initial barrier for level 1
-    barrier_x, barrier_y = 10, 20
-    barrier_width, barrier_height = 16, 3
-    barriers.append((barrier_x, barrier_y, barrier_width, barrier_height, False, False))  # Strong, inactive
-    
-    # Place the initial barrier
-    place_barrier(grid, barrier_x, barrier_y, barrier_width, barrier_height, 3)
-    
-    # Create initial flood shadow mask
-    flood_shadow_mask = create_flood_shadow_mask_with_weak_barriers(barriers)
+    sim = Simulation(current_level=1, levels=levels, profiler=profiler)
+    inputs = InputRecorder(sim) if args.record else sim  # Where inputs go (both have apply_input)
+    bitboard = isinstance(sim.grid, BitGrid)  # No NumPy: drawn whole by BitRenderer, no scrolling or zoom
+    grid_shape = sim.grid.shape
+    screen, viewport = open_window(grid_shape)
+    renderer = None
+    view = None  # Viewport rect and zoom the renderer was made for
+    scroll_keys = {pygame.K_w: (0, -1), pygame.K_s: (0, 1), pygame.K_a: (-1, 0), pygame.K_d: (1, 0)}
+    caption = sim.caption
+    pygame.display.set_caption(caption)
     
     # Enable key repeat for smooth movement
     pygame.key.set_repeat(100, 50)  # 100ms delay, 50ms interval
 
     running = True
     while running:
-        dt = clock.tick(60) / 1000.0  # Delta time in seconds
+        profiler.begin_frame()
+        frame_ms = clock.tick(60)
+        dt = frame_ms / 1000.0  # Delta time in seconds
+        if args.record:
+            inputs.begin_frame(frame_ms)
         
         # ---- Input ----
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
+        with profiler.phase('input'):
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
                     running = False
-                elif event.key == pygame.K_g:
-                    # Toggle grid lines
-                    global DRAW_GRID
-                    DRAW_GRID = not DRAW_GRID
-                elif event.key == pygame.K_r and not flood_active:
-                    # Reset current level
-                    priority_zones = reset_level(grid, current_level, barriers, priority_zones)
-                    selected_barrier = None
-                    game_over = False
-                    level_complete = False
-                    flood_shadow_mask = create_flood_shadow_mask_with_weak_barriers(barriers)
-                    pygame.display.set_caption(f"Stem the Tide — Level {current_level}: Press SPACE to start the flood!")
-                elif event.key == pygame.K_SPACE and not flood_active and not game_over:
-                    # Start the flood!
-                    flood_active = True
-                    flood_row = 1  # Start from second row (first is already tide)
-                    flood_timer = 0
-                    # Update shadow mask for current barrier positions
-                    flood_shadow_mask = create_flood_shadow_mask_with_weak_barriers(barriers)
-                elif selected_barrier is not None and not game_over:
-                    # Move barrier with arrow keys when active
-                    barrier_x, barrier_y, barrier_width, barrier_height, is_weak, is_active = barriers[selected_barrier]
-                    new_x, new_y = barrier_x, barrier_y
-                    
-                    if event.key == pygame.K_UP:
-                        new_y -= 1
-                    elif event.key == pygame.K_DOWN:
-                        new_y += 1
-                    elif event.key == pygame.K_LEFT:
-                        new_x -= 1
-                    elif event.key == pygame.K_RIGHT:
-                        new_x += 1
-                    
-                    # Check if new position is valid
-                    if is_valid_position(grid, new_x, new_y, barrier_width, barrier_height):
-                        # Remove barrier from old position
-                        remove_barrier(grid, barrier_x, barrier_y, barrier_width, barrier_height)
-                        # Place barrier at new position
-                        barrier_x, barrier_y = new_x, new_y
-                        active_state = 12 if is_weak else 4  # Green for active
-                        place_barrier(grid, barrier_x, barrier_y, barrier_width, barrier_height, active_state)
-                        # Update barriers list
-                        barriers[selected_barrier] = (barrier_x, barrier_y, barrier_width, barrier_height, is_weak, True)
-                        # Recreate shadow mask
-                        flood_shadow_mask = create_flood_shadow_mask_with_weak_barriers(barriers)
-
-            elif event.type == pygame.MOUSEBUTTONDOWN and not game_over:
-                if event.button == 1:  # Left click
-                    # Get mouse position in grid coordinates
-                    mouse_x, mouse_y = event.pos
-                    grid_x = mouse_x // PIXEL_SIZE
-                    grid_y = mouse_y // PIXEL_SIZE
-                    
-                    # Check if clicked on any barrier
-                    for i, barrier in enumerate(barriers):
-                        barrier_x, barrier_y, barrier_width, barrier_height, is_weak, is_active = barrier
-                        if (barrier_x <= grid_x < barrier_x + barrier_width and 
-                            barrier_y <= grid_y < barrier_y + barrier_height):
-                            
-                            if selected_barrier == i:
-                                # Deactivate barrier
-                                selected_barrier = None
-                                inactive_state = 11 if is_weak else 3  # Brown/grey for inactive
-                                place_barrier(grid, barrier_x, barrier_y, barrier_width, barrier_height, inactive_state)
-                                barriers[i] = (barrier_x, barrier_y, barrier_width, barrier_height, is_weak, False)
-                            else:
-                                # Activate this barrier, deactivate others
-                                for j, other_barrier in enumerate(barriers):
-                                    other_x, other_y, other_w, other_h, other_weak, other_active = other_barrier
-                                    if other_active:
-                                        other_inactive_state = 11 if other_weak else 3
-                                        place_barrier(grid, other_x, other_y, other_w, other_h, other_inactive_state)
-                                        barriers[j] = (other_x, other_y, other_w, other_h, other_weak, False)
-                                
-                                # Activate clicked barrier
-                                selected_barrier = i
-                                active_state = 12 if is_weak else 4  # Green for active
-                                place_barrier(grid, barrier_x, barrier_y, barrier_width, barrier_height, active_state)
-                                barriers[i] = (barrier_x, barrier_y, barrier_width, barrier_height, is_weak, True)
-                            break
+
+                elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                    view = None  # Redrawn from scratch by a new renderer (there may be none yet)
+
+                elif event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_ESCAPE:
+                        running = False
+                    elif event.key == pygame.K_g:
+                        # Toggle grid lines
+                        global DRAW_GRID
+                        DRAW_GRID = not DRAW_GRID
+                    elif event.key == pygame.K_p and np is not None:
+                        # Toggle the frame timing overlay (starts recording if not profiling already)
+                        show_profile = not show_profile
+                        profiler.enable()
+                        overlay = None
+                    elif event.key == pygame.K_h and np is not None:
+                        # Toggle the placement hints of the selected barrier
+                        show_hints = not show_hints
+                    elif event.key in (pygame.K_COMMA, pygame.K_PERIOD):
+                        # Slow down / speed up the flood
+                        inputs.apply_input('speed', 1 if event.key == pygame.K_PERIOD else -1)
+                    elif event.key == pygame.K_r:
+                        # Reset current level
+                        inputs.apply_input('reset')
+                    elif event.key == pygame.K_SPACE:
+                        # Start the flood!
+                        inputs.apply_input('start')
+                    elif event.key in arrow_moves:
+                        # Move barrier with arrow keys when active
+                        inputs.apply_input('move', *arrow_moves[event.key])
+                    elif event.key in scroll_keys and not bitboard:
+                        # Scroll the view by an eighth of the window
+                        dx, dy = scroll_keys[event.key]
+                        x, y, width, height = viewport.rect
+                        viewport.scroll(dx * max(1, width // 8), dy * max(1, height // 8))
+                    elif event.key in (pygame.K_EQUALS, pygame.K_MINUS) and not bitboard:
+                        # Zoom in / out around the middle of the window
+                        step = 1 if event.key == pygame.K_EQUALS else -1
+                        viewport.zoom_by(step, (viewport.window_w // 2, viewport.window_h // 2))
+
+                elif event.type == pygame.MOUSEWHEEL and not bitboard:
+                    # Zoom around the mouse
+                    viewport.zoom_by(1 if event.y > 0 else -1, pygame.mouse.get_pos())
+
+                elif event.type == pygame.MOUSEBUTTONDOWN:
+                    if event.button == 1:  # Left click
+                        # Get mouse position in grid coordinates
+                        inputs.apply_input('click', *viewport.to_grid(*event.pos))
 
         # ---- Update ----
-        if flood_active and not game_over:
-            # Check if priority zone got wet
-            if check_priority_wet(grid, priority_zones):
-                game_over = True
-                mark_priority_wet(grid, priority_zones)
-                flood_active = False
-            
-            flood_timer += dt
-            if flood_timer >= flood_speed:
-                flood_timer = 0
-                # Flood the next row
-                if flood_row < GRID_H - 3:  # Don't flood metadata zone
-                    # Flood normally, but exclude shadow areas
-                    for x in range(3, GRID_W - 3):  # Don't flood metadata zone
-                        # Only flood if the cell is empty and not in shadow mask
-                        if grid[flood_row][x] == 0 and (x, flood_row) not in flood_shadow_mask:
-                            grid[flood_row][x] = 2  # State 2 = tide
-                    flood_row += 1
-                else:
-                    # Flood complete
-                    flood_active = False
-                    # Check if level is complete
-                    if not game_over:
-                        level_complete = True
-                        current_level += 1
-                        
-                        if current_level == 2:
-                            # Setup Level 2
-                            priority_zones = setup_level_2(grid)
-                            
-                            # Clear old barriers and add new ones
-                            barriers.clear()
-                            selected_barrier = None
-                            
-                            # Add strong barrier (12 pixels)
-                            strong_barrier_x, strong_barrier_y = 15, 25
-                            barriers.append((strong_barrier_x, strong_barrier_y, 12, 3, False, False))
-                            place_barrier(grid, strong_barrier_x, strong_barrier_y, 12, 3, 3)
-                            
-                            # Add weak barrier (12 pixels)
-                            weak_barrier_x, weak_barrier_y = 45, 25
-                            barriers.append((weak_barrier_x, weak_barrier_y, 12, 3, True, False))
-                            place_barrier(grid, weak_barrier_x, weak_barrier_y, 12, 3, 11)
-                            
-                            pygame.display.set_caption("Stem the Tide — Level 2: Two priority zones! Press SPACE to start the flood!")
-                        else:
-                            pygame.display.set_caption(f"Stem the Tide — Level {current_level} Complete! Press ESC to exit.")
+        with profiler.phase('flood'):
+            sim.update(dt)
+        speed = "" if sim.time_scale == 1 else " [instant]" if sim.time_scale == INSTANT else f" [x{sim.time_scale}]"
+        if sim.caption + speed != caption:
+            caption = sim.caption + speed
+            pygame.display.set_caption(caption)
 
         # ---- Draw ----
-        screen.fill(STATES[0])  # Fill with empty state color
-
-        if DRAW_GRID:
-            # draw faint grid lines (optional)
-            for cx in range(0, WIN_W, PIXEL_SIZE):
-                pygame.draw.line(screen, GRID_COLOR, (cx, 0), (cx, WIN_H), 1)
-            for cy in range(0, WIN_H, PIXEL_SIZE):
-                pygame.draw.line(screen, GRID_COLOR, (0, cy), (WIN_W, cy), 1)
-
-        # Draw all grid cells based on their state
-        for y in range(GRID_H):
-            for x in range(GRID_W):
-                state = grid[y][x]
-                if state != 0:  # Don't draw empty cells (they're already the background)
-                    color = get_color_for_state(state)
-                    rect = pygame.Rect(x * PIXEL_SIZE, y * PIXEL_SIZE, PIXEL_SIZE, PIXEL_SIZE)
-                    pygame.draw.rect(screen, color, rect)
-
-        pygame.display.flip()
+        if sim.grid.shape != grid_shape:
+            # New level has a different size (set_mode clears the screen, so draw everything again)
+            grid_shape = sim.grid.shape
+            screen, viewport = open_window(grid_shape)
+            view = None
+        if bitboard:
+            if renderer is None or view != grid_shape:
+                renderer = BitRenderer(screen, grid_shape[1], grid_shape[0])
+                view = grid_shape
+        elif (viewport.rect, viewport.zoom) != view:
+            # Only the cells in the viewport are drawn; a scrolled view is drawn from scratch
+            view = (viewport.rect, viewport.zoom)
+            renderer = Renderer(screen, viewport.rect[2], viewport.rect[3], viewport.zoom)
+        if show_profile and (overlay is None or profiler.frames - overlay_frame >= 30):
+            # Refresh the timings twice a second
+            font = font or pygame.font.SysFont('monospace', 14)
+            overlay = profile_overlay(font, profiler.percentiles())
+            overlay_frame = profiler.frames
+        heatmap = sim.placement_hints() if show_hints else None
+        if heatmap is None:
+            tint = tint_for = None
+        elif (heatmap, heatmap.selected, viewport.rect) != tint_for:
+            # Tint the positions the selected barrier can go (only changes with the selection or the view)
+            tint_for = (heatmap, heatmap.selected, viewport.rect)
+            tint = placement_tint(heatmap, viewport.rect)
+        with profiler.phase('draw'):
+            cells = sim.grid if bitboard else sim.grid.region(*viewport.rect)
+            colors = None
+            if sim.initial and sim.layers is not None and sim.layers.colors is not None:
+                # Level untouched since it was entered or reset: its colors come with the cached level
+                x, y, width, height = viewport.rect
+                colors = sim.layers.colors[y:y + height, x:x + width]
+            renderer.draw(cells, DRAW_GRID, overlay if show_profile else None, tint, colors)
 
+    profiler.end_frame()
+    if args.record:
+        inputs.save(args.record)
+    if args.profile:
+        profiler.dump(args.profile)
     pygame.quit()
     sys.exit()
 
+LevelReport = collections.namedtuple('LevelReport', ['name', 'errors', 'solutions', 'best_moves', 'solve_seconds',
+                                                     'flood_seconds', 'ticks'])
+
+LEVEL_KEYS = ('width', 'height', 'tide', 'priority_zones', 'barriers')
+
+def load_level_dir(path):
+    """(name, level definition or None, error or None) for each level in a directory's .json files, in
+    file name order; a file holds one level definition (like an entry of LEVELS) or a list of them"""
+    entries = []
+    for file_name in sorted(os.listdir(path)):
+        if not file_name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(path, file_name), encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as error:
+            entries.append((file_name, None, f"cannot read: {error}"))
+            continue
+        if isinstance(data, list):
+            entries.extend((f"{file_name}[{i}]", level, None) for i, level in enumerate(data))
+        else:
+            entries.append((file_name, data, None))
+    return entries
+
+def rects_overlap(rect, other):
+    """Whether two (x, y, width, height) rectangles overlap"""
+    x, y, width, height = rect
+    other_x, other_y, other_width, other_height = other
+    return x < other_x + other_width and other_x < x + width and y < other_y + other_height and other_y < y + height
+
+def level_errors(level, current_level=1, total_levels=1):
+    """Problems with a level definition's geometry, as a list of messages (empty if it is fine): priority
+    zones, barriers and splash pads must be lists of integers lying inside the grid, clear of the metadata
+    edges, barriers may not overlap each other, and neither barriers nor splash pads may cover a priority zone"""
+    if not isinstance(level, dict):
+        return ["not a level definition"]
+    missing = [key for key in LEVEL_KEYS if key not in level]
+    if missing:
+        return [f"missing {', '.join(missing)}"]
+    if not all(isinstance(level[key], int) and level[key] > 0 for key in ('width', 'height')):
+        return ["width and height must be positive integers"]
+    try:
+        resolve_tide_sources(level['tide'])
+    except (KeyError, TypeError):
+        return [f"unknown tide source in {level['tide']!r}"]
+    # (x, y, size) squares and (x, y, width, height, is_weak) barriers
+    shapes = {'priority_zones': ('priority zone', 3), 'barriers': ('barrier', 5), 'splash_pads': ('splash pad', 3)}
+    errors = []
+    for key, (kind, length) in shapes.items():
+        entries = level.get(key, [])
+        if not isinstance(entries, list):
+            errors.append(f"{key} must be a list")
+            continue
+        for i, entry in enumerate(entries):
+            if not (isinstance(entry, list) and len(entry) == length and all(isinstance(n, int) for n in entry)):
+                errors.append(f"{kind} {i} {entry!r} is not a list of {length} integers")
+    if errors:
+        return errors
+
+    width, height = level['width'], level['height']
+    grid = Grid(width, height)
+    setup_metadata_edges(grid, current_level, total_levels)
+
+    def outside(x, y, rect_width, rect_height):
+        """Whether a rectangle leaves the grid or covers the metadata edges (the only cells not left empty)"""
+        return (x < 0 or y < 0 or rect_width < 1 or rect_height < 1 or x + rect_width > width
+                or y + rect_height > height or grid.cells[y:y + rect_height, x:x + rect_width].any())
+
+    zones = [(zone_x, zone_y, zone_size, zone_size) for zone_x, zone_y, zone_size in level['priority_zones']]
+    for i, zone in enumerate(zones):
+        if outside(*zone):
+            errors.append(f"priority zone {i} {tuple(level['priority_zones'][i])} overlaps the metadata edges")
+    barriers = [tuple(barrier[:4]) for barrier in level['barriers']]
+    for i, barrier in enumerate(barriers):
+        if outside(*barrier):
+            errors.append(f"barrier {i} {barrier} overlaps the metadata edges")
+        for j in range(i):
+            if rects_overlap(barrier, barriers[j]):
+                errors.append(f"barriers {j} and {i} overlap")
+        for j, zone in enumerate(zones):
+            if rects_overlap(barrier, zone):
+                errors.append(f"barrier {i} {barrier} covers priority zone {j}")
+    for i, (pad_x, pad_y, pad_size) in enumerate(level.get('splash_pads', [])):
+        pad = (pad_x, pad_y, pad_size, pad_size)
+        if outside(*pad):
+            errors.append(f"splash pad {i} {(pad_x, pad_y, pad_size)} overlaps the metadata edges")
+        for j, zone in enumerate(zones):
+            if rects_overlap(pad, zone):
+                errors.append(f"splash pad {i} {(pad_x, pad_y, pad_size)} covers priority zone {j}")
+    return errors
+
+def _init_validator():
+    global LEVEL_CACHE_DIR
+    LEVEL_CACHE_DIR = ''  # Levels being validated (and their trial layouts) stay out of the level cache
+
+def validate_level(task):
+    """Check one level (name, level definition, level number, level count): geometry, then that the solver
+    finds a winning layout, then time a flood of that layout in the Simulation. Returns a LevelReport."""
+    name, level, current_level, total_levels = task
+    try:
+        errors = level_errors(level, current_level, total_levels)
+    except (TypeError, ValueError) as error:
+        errors = [f"malformed level definition: {error}"]
+    if errors:
+        return LevelReport(name, errors, None, None, None, None, None)
+    try:
+        return check_level(name, level)
+    except Exception as error:  # A level the checks above let through must fail its row, not the whole run
+        return LevelReport(name, [f"crashed: {type(error).__name__}: {error}"], None, None, None, None, None)
+
+def check_level(name, level):
+    """The solver and simulation part of validate_level, for a level with valid geometry"""
+    errors = []
+    # Solvable?
+    start = time.perf_counter()
+    result = solve_level(level, workers=1)
+    solve_seconds = time.perf_counter() - start
+    if not result.count:
+        errors.append("no barrier layout keeps every priority zone dry")
+        layout = [barrier[:2] for barrier in level['barriers']]
+    else:
+        layout = result.best
+
+    # Simulation cost: the flood of the winning layout (or of the starting one), which must agree with the solver
+    trial = dict(level, barriers=[[x, y, *barrier[2:]] for (x, y), barrier in zip(layout, level['barriers'])])
+    sim = Simulation(levels=[trial])
+    start = time.perf_counter()
+    dry = sim.run_to_completion()
+    flood_seconds = time.perf_counter() - start
+    if result.count and not dry:
+        errors.append(f"solver's layout {layout} loses in the simulation")
+    return LevelReport(name, errors, result.count, result.best_moves, solve_seconds, flood_seconds, sim.flood.tick)
+
+def validate_main(argv=None):
+    parser = argparse.ArgumentParser(prog="stem_the_tide.py validate",
+                                     description="Validate a directory of Stem the Tide level definitions")
+    parser.add_argument('directory', help="directory of .json level definitions")
+    parser.add_argument('-j', '--jobs', type=int, default=None, help="worker processes (default: one per CPU)")
+    args = parser.parse_args(argv)
+    if np is None:
+        parser.error("validating levels needs NumPy")
+    if not os.path.isdir(args.directory):
+        parser.error(f"not a directory: {args.directory}")
+
+    entries = load_level_dir(args.directory)
+    reports = [LevelReport(name, [error], None, None, None, None, None)
+               for name, level, error in entries if error is not None]
+    levels = [(name, level) for name, level, error in entries if error is None]
+    tasks = [(name, level, number, len(levels)) for number, (name, level) in enumerate(levels, 1)]
+    start = time.perf_counter()
+    with concurrent.futures.ProcessPoolExecutor(args.jobs, initializer=_init_validator) as executor:
+        reports += executor.map(validate_level, tasks)
+    elapsed = time.perf_counter() - start
+
+    def ms(seconds):
+        return "-" if seconds is None else f"{seconds * 1000:.1f}"
+
+    width = max([len(report.name) for report in reports] + [5])
+    print(f"{'level':<{width}}  {'status':<6} {'layouts':>8} {'moves':>6} {'solve ms':>9} {'flood ms':>9} {'ticks':>6}")
+    for report in sorted(reports, key=lambda report: report.name):
+        status = "FAIL" if report.errors else "ok"
+        print(f"{report.name:<{width}}  {status:<6} {'-' if report.solutions is None else report.solutions:>8} "
+              f"{'-' if report.best_moves is None else report.best_moves:>6} {ms(report.solve_seconds):>9} "
+              f"{ms(report.flood_seconds):>9} {'-' if report.ticks is None else report.ticks:>6}")
+        for error in report.errors:
+            print(f"{'':<{width}}    {error}")
+    failed = sum(bool(report.errors) for report in reports)
+    busy = sum((report.solve_seconds or 0) + (report.flood_seconds or 0) for report in reports)
+    print(f"{len(reports)} levels: {len(reports) - failed} ok, {failed} failed in {elapsed:.2f} s "
+          f"({busy:.2f} s of solving and flooding)")
+    sys.exit(1 if failed else 0)
+
 if __name__ == "__main__":
-    main()
+    if sys.argv[1:2] == ['validate']:
+        validate_main(sys.argv[2:])
+    else:
+        main()
@@ -0,0 +1,11 @@
+''' Test setup: headless pygame, the repo root importable, and no on-disk level cache unless a test asks for one '''
+
+import os
+import sys
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')  # Headless pygame
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+os.environ['STEM_THE_TIDE_CACHE'] = ''  # Build every level, leave the user's level cache alone
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
@@ -0,0 +1,45 @@
+''' Helpers shared by the tests: random levels, inputs and barrier layouts '''
+
+import stem_the_tide as stt
+
+SIDES = ['top', 'left', 'bottom', 'right']
+MOVES = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+
+def random_level(rng):
+    """A level of random size (not always a multiple of CHUNK_SIZE) with random tides, barriers and splash pads"""
+    width, height = rng.choice([64, 100, 130, 192]), rng.choice([64, 90, 128])
+    return {
+        'width': width, 'height': height, 'intro': None,
+        'tide': rng.sample(SIDES, rng.randint(1, 4)),
+        'priority_zones': [[rng.randint(5, 40), rng.randint(40, 50), rng.randint(2, 4)]
+                           for _ in range(rng.randint(1, 2))],
+        'barriers': [[rng.randint(4, 50), rng.randint(4, 35), rng.randint(2, 14), rng.randint(1, 4), rng.random() < 0.4]
+                     for _ in range(rng.randint(1, 6))],
+        'splash_pads': [[rng.randint(4, 55), rng.randint(4, 55), rng.randint(1, 4)] for _ in range(rng.randint(0, 3))],
+    }
+
+def random_inputs(rng, sim, count):
+    """Random clicks on barriers and arrow moves for a simulation"""
+    inputs = []
+    for _ in range(count):
+        if rng.random() < 0.2:
+            barrier = rng.choice(sim.barriers)
+            inputs.append(('click', barrier[0], barrier[1]))
+        else:
+            inputs.append(('move', *rng.choice(MOVES)))
+    return inputs
+
+def with_layout(level, layout):
+    """A level definition with its barriers moved to layout ((x, y) per barrier)"""
+    return dict(level, barriers=[[x, y, *barrier[2:]] for (x, y), barrier in zip(layout, level['barriers'])])
+
+def random_layouts(rng, grid, barriers, count):
+    """count layouts of valid (x, y) positions for each barrier, picked at random (barriers may overlap)"""
+    positions = [stt.barrier_positions(grid, barrier[2], barrier[3]) for barrier in barriers]
+    return [[rng.choice(choices) for choices in positions] for _ in range(count)]
+
+def overlapping(layout, barriers):
+    """Whether any two barriers of a layout overlap"""
+    rects = [(x, y, barrier[2], barrier[3]) for (x, y), barrier in zip(layout, barriers)]
+    return any(x < other_x + other_w and other_x < x + w and y < other_y + other_h and other_y < y + h
+               for i, (x, y, w, h) in enumerate(rects) for other_x, other_y, other_w, other_h in rects[:i])
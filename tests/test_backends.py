@@ -0,0 +1,52 @@
+''' The grid backends must stay interchangeable: same cells after every input and every flood tick '''
+
+import random
+
+import pytest
+
+np = pytest.importorskip('numpy')  # The reference backend, Grid
+import stem_the_tide as stt
+from support import random_inputs, random_level
+
+BACKENDS = (stt.Grid, stt.BitGrid, stt.ChunkedGrid)
+
+@pytest.mark.parametrize('seed', range(12))
+def test_backends_agree_every_tick(seed):
+    rng = random.Random(seed)
+    level = random_level(rng) if seed % 3 else rng.choice(stt.LEVELS)
+    sims = [stt.Simulation(levels=[level], grid_class=grid_class) for grid_class in BACKENDS]
+    assert len({stt.grid_hash(sim.grid) for sim in sims}) == 1
+    for action in random_inputs(rng, sims[0], rng.randint(0, 40)):
+        for sim in sims:
+            sim.apply_input(*action)
+    assert len({stt.grid_hash(sim.grid) for sim in sims}) == 1
+    for sim in sims:
+        sim.start_flood()
+    while sims[0].flood_active:
+        for sim in sims:
+            sim.step()
+        assert len({stt.grid_hash(sim.grid) for sim in sims}) == 1, f"tick {sims[0].flood.tick}"
+        assert len({(sim.flood_active, sim.game_over) for sim in sims}) == 1
+
+@pytest.mark.parametrize('grid_class', BACKENDS)
+def test_is_level_complete(grid_class):
+    grid = grid_class(100, 70)
+    stt.setup_metadata_edges(grid, 1, 3)
+    assert stt.is_level_complete(grid) is False
+    grid.fill_rect(50, 69, 1, 1, 2)
+    assert stt.is_level_complete(grid) is True
+    assert stt.is_level_complete(grid, flood_active=True) is False
+
+@pytest.mark.parametrize('grid_class', [stt.BitGrid, stt.ChunkedGrid])
+def test_predict_on_other_backends(grid_class):
+    for level in stt.LEVELS:
+        expected = stt.Simulation(levels=[level]).predict()
+        prediction = stt.Simulation(levels=[level], grid_class=grid_class).predict()
+        assert (prediction.tide == expected.tide).all()
+        assert list(prediction.zone_wet) == list(expected.zone_wet)
+
+def test_large_boards_use_chunks():
+    sim = stt.Simulation(levels=[dict(stt.LEVELS[0], width=600, height=520)])
+    assert isinstance(sim.grid, stt.ChunkedGrid)
+    # Open water stays one state per chunk
+    assert sim.grid.allocated < len(list(sim.grid.spans(0, 600))) * len(list(sim.grid.spans(0, 520)))
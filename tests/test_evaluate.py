@@ -0,0 +1,46 @@
+''' evaluate_layouts must agree with the solver and with predict_flood '''
+
+import random
+
+import pytest
+
+np = pytest.importorskip('numpy')
+import stem_the_tide as stt
+from support import overlapping, random_layouts, random_level, with_layout
+
+@pytest.mark.parametrize('level_number', [1, 2])
+def test_evaluator_matches_solver(level_number):
+    grid, barriers, priority_zones, sources, splash_pads = stt.level_problem(level_number)
+    result = stt.solve_level(level_number, find_all=True, workers=1)
+    solutions = set(result.solutions)
+
+    # Every solution is valid and keeps every zone dry
+    positions = np.array(sorted(solutions))
+    assert stt.layouts_valid(grid, barriers, positions).all()
+    assert not stt.evaluate_layouts(grid, barriers, priority_zones, positions, sources).any()
+
+    # Every valid layout the evaluator finds dry is a solution
+    rng = random.Random(level_number)
+    layouts = random_layouts(rng, grid, barriers, 2000)
+    layouts = [layout for layout in layouts if not overlapping(layout, barriers)]
+    wet = stt.evaluate_layouts(grid, barriers, priority_zones, np.array(layouts), sources)
+    for layout, zone_wet in zip(layouts, wet):
+        assert (not zone_wet.any()) == (tuple(map(tuple, layout)) in solutions)
+
+@pytest.mark.parametrize('seed', range(12))
+def test_evaluator_matches_predict(seed):
+    rng = random.Random(seed)
+    level = random_level(rng) if seed % 3 else stt.LEVELS[seed // 3 % len(stt.LEVELS)]
+    grid, barriers, priority_zones, sources, splash_pads = stt.level_problem(level)
+    layouts = random_layouts(rng, grid, barriers, 20)
+    if seed < 6 and seed % 3 == 0:
+        # Make sure some layouts win
+        layouts += [list(layout) for layout in stt.solve_level(level, find_all=True, workers=1).solutions[:5]]
+    layouts = [layout for layout in layouts if not overlapping(layout, barriers)]
+    # With splash pads each layout goes through predict_flood, without them through the shadow masks
+    for pads in {tuple(splash_pads), ()}:
+        wet = stt.evaluate_layouts(grid, barriers, priority_zones, np.array(layouts).reshape(-1, len(barriers), 2),
+                                   sources, list(pads))
+        for layout, zone_wet in zip(layouts, wet):
+            prediction = stt.Simulation(levels=[dict(with_layout(level, layout), splash_pads=list(pads))]).predict()
+            assert list(prediction.zone_wet) == list(zone_wet)
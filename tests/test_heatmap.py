@@ -0,0 +1,49 @@
+''' PlacementHeatmap must agree with evaluate_layouts as the barriers move '''
+
+import random
+
+import pytest
+
+np = pytest.importorskip('numpy')
+import stem_the_tide as stt
+from support import MOVES
+
+@pytest.mark.parametrize('level_number', [1, 2, 3])
+def test_heatmap_matches_evaluator(level_number):
+    level = stt.LEVELS[level_number - 1]
+    grid, barriers, priority_zones, sources, splash_pads = stt.level_problem(level_number)
+    sim = stt.Simulation(levels=[level])
+    rng = random.Random(level_number)
+    for _ in range(4):
+        for i, barrier in enumerate(sim.barriers):
+            if sim.selected_barrier != i:
+                sim.click(barrier[0], barrier[1])
+            heatmap = sim.placement_hints()
+            rows, cols = heatmap.kept.shape
+            positions = np.array([[barrier[:2] for barrier in sim.barriers]] * (rows * cols))
+            ys, xs = np.mgrid[0:rows, 0:cols]
+            positions[:, i, 0], positions[:, i, 1] = xs.ravel(), ys.ravel()
+            # Splash pads are not part of the hints
+            wet = stt.evaluate_layouts(grid, barriers, priority_zones, positions, sources)
+            assert (~wet.T.reshape(len(priority_zones), rows, cols) == heatmap.dry).all()
+            assert (heatmap.kept == heatmap.dry.sum(axis=0)).all()
+            for _ in range(rng.randint(0, 20)):
+                sim.move_selected_barrier(*rng.choice(MOVES))
+
+def test_no_hints_without_a_selection_or_on_bit_grids():
+    assert stt.Simulation().placement_hints() is None
+    sim = stt.Simulation(grid_class=stt.BitGrid)
+    barrier = sim.barriers[0]
+    sim.click(barrier[0], barrier[1])
+    assert sim.placement_hints() is None
+
+def test_tint_marks_valid_positions():
+    sim = stt.Simulation()
+    barrier = sim.barriers[0]
+    sim.click(barrier[0], barrier[1])
+    heatmap = sim.placement_hints()
+    rows, cols = heatmap.kept.shape
+    tint = stt.placement_tint(heatmap, (0, 0, sim.grid.width, sim.grid.height))
+    assert tint.shape == (sim.grid.height, sim.grid.width, 4)
+    assert ((tint[:rows, :cols, 3] > 0) == heatmap.valid).all()
+    assert not tint[rows:, :, 3].any() and not tint[:, cols:, 3].any()
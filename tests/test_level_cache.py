@@ -0,0 +1,86 @@
+''' The on-disk cache of each level's initial state '''
+
+import os
+
+import pytest
+
+np = pytest.importorskip('numpy')
+import stem_the_tide as stt
+
+LEVEL = stt.LEVELS[2]
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(stt, 'LEVEL_CACHE_DIR', str(tmp_path))
+    stt._level_layers.cache_clear()
+    yield tmp_path
+    stt._level_layers.cache_clear()
+
+def cache_files(directory):
+    return sorted(directory.glob('*.level'))
+
+def assert_same_layers(got, built):
+    assert (got.cells == built.cells).all() and (got.colors == built.colors).all()
+    assert list(got.shadows) == list(built.shadows)
+    for side in built.shadows:
+        assert got.shadows[side].dtype == built.shadows[side].dtype
+        assert (got.shadows[side] == built.shadows[side]).all()
+
+def test_built_layers_are_saved_and_loaded(cache_dir, monkeypatch):
+    built = stt.level_layers(LEVEL, 3, 3, stt.Grid)
+    [path] = cache_files(cache_dir)
+    assert str(path) == stt.level_cache_path(stt.level_key(LEVEL), 3, 3)
+    assert_same_layers(stt.load_cached_layers(path, LEVEL['width'], LEVEL['height'], list(built.shadows)), built)
+
+    # A later run loads the level without building it
+    stt._level_layers.cache_clear()
+    monkeypatch.setattr(stt, 'setup_level', None)
+    loaded = stt.level_layers(LEVEL, 3, 3, stt.Grid)
+    assert loaded is not built
+    assert_same_layers(loaded, built)
+    assert not loaded.cells.flags.writeable
+
+def test_wrong_size_file_is_rebuilt(cache_dir):
+    built = stt.level_layers(LEVEL, 3, 3, stt.Grid)
+    [path] = cache_files(cache_dir)
+    size = path.stat().st_size
+    for data in (path.read_bytes()[:size // 2], path.read_bytes() + b'\0', b''):
+        path.write_bytes(data)
+        assert stt.load_cached_layers(path, LEVEL['width'], LEVEL['height'], list(built.shadows)) is None
+        stt._level_layers.cache_clear()
+        assert_same_layers(stt.level_layers(LEVEL, 3, 3, stt.Grid), built)
+        assert path.stat().st_size == size
+
+def test_missing_file():
+    assert stt.load_cached_layers('/nonexistent/level.level', 8, 8, ['top']) is None
+
+def test_cache_is_keyed_by_level_and_position(cache_dir):
+    stt.level_layers(LEVEL, 3, 3, stt.Grid)
+    stt.level_layers(LEVEL, 1, 3, stt.Grid)
+    stt.level_layers(dict(LEVEL, tide=['left']), 3, 3, stt.Grid)
+    assert len(cache_files(cache_dir)) == 3
+
+def test_only_grid_levels_are_cached(cache_dir):
+    stt.level_layers(LEVEL, 3, 3, stt.BitGrid)
+    assert cache_files(cache_dir) == []
+
+def test_cache_off(cache_dir, monkeypatch):
+    monkeypatch.setattr(stt, 'LEVEL_CACHE_DIR', '')
+    assert stt.level_cache_path(stt.level_key(LEVEL), 3, 3) is None
+    stt.level_layers(LEVEL, 3, 3, stt.Grid)
+    assert cache_files(cache_dir) == []
+
+def test_trim_removes_the_oldest_files(tmp_path):
+    for age in range(5):
+        path = tmp_path / f'{age}.level'
+        path.write_bytes(b'\0' * 100)
+        os.utime(path, (1000 - age, 1000 - age))
+    (tmp_path / 'other.txt').write_bytes(b'\0' * 1000)
+    stt.trim_level_cache(tmp_path, 250)
+    assert [path.name for path in cache_files(tmp_path)] == ['0.level', '1.level']
+    assert (tmp_path / 'other.txt').exists()
+
+def test_saving_trims_the_cache(cache_dir, monkeypatch):
+    monkeypatch.setattr(stt, 'LEVEL_CACHE_MAX_BYTES', 1)
+    stt.level_layers(LEVEL, 3, 3, stt.Grid)
+    assert cache_files(cache_dir) == []
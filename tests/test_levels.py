@@ -0,0 +1,49 @@
+''' Level packs and the cached initial state of each level '''
+
+import pytest
+
+import stem_the_tide as stt
+
+@pytest.fixture
+def pack(tmp_path):
+    path = tmp_path / 'levels.pack'
+    stt.write_level_pack(path, stt.LEVELS)
+    pack = stt.LevelPack(path)
+    yield pack
+    pack.close()
+
+def test_pack_round_trip(pack):
+    assert len(pack) == len(stt.LEVELS)
+    assert [pack[i] for i in range(len(pack))] == stt.LEVELS
+
+def test_pack_decodes_levels_when_first_entered(pack):
+    assert pack.decoded == {}
+    sim = stt.Simulation(levels=pack)
+    assert list(pack.decoded) == [0]
+    sim.load_level(2)
+    assert sorted(pack.decoded) == [0, 1]
+    assert pack[1] is pack[1]
+
+def test_pack_index_out_of_range(pack):
+    with pytest.raises(IndexError):
+        pack[len(pack)]
+
+def test_not_a_pack(tmp_path):
+    path = tmp_path / 'levels.json'
+    path.write_bytes(b'[{"width": 64}]')
+    with pytest.raises(ValueError):
+        stt.LevelPack(path)
+
+def test_layers_are_built_once():
+    level = dict(stt.LEVELS[0])
+    assert stt.level_layers(level, 1, 3) is stt.level_layers(dict(level), 1, 3)
+
+def test_grid_layers_are_read_only():
+    pytest.importorskip('numpy')
+    layers = stt.level_layers(stt.LEVELS[0], 1, 3, stt.Grid)
+    assert layers._fields == ('cells', 'shadows', 'colors')
+    for array in (layers.cells, layers.colors, *layers.shadows.values()):
+        assert not array.flags.writeable
+    # A simulation restores the level into its own writable cells
+    sim = stt.Simulation(grid_class=stt.Grid)
+    assert sim.grid.cells.flags.writeable and (sim.grid.cells == layers.cells).all()
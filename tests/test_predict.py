@@ -0,0 +1,42 @@
+''' predict_flood must tell the outcome of a flood without running it '''
+
+import random
+
+import pytest
+
+np = pytest.importorskip('numpy')
+import stem_the_tide as stt
+from support import random_inputs, random_level, with_layout
+
+@pytest.mark.parametrize('seed', range(30))
+def test_prediction_matches_the_flood(seed):
+    rng = random.Random(seed)
+    level = random_level(rng) if seed % 3 else stt.LEVELS[seed // 3 % len(stt.LEVELS)]
+    sim = stt.Simulation(levels=[level])
+    for action in random_inputs(rng, sim, rng.randint(0, 60)):
+        sim.apply_input(*action)
+    prediction = sim.predict()
+
+    # Predicting part way through the flood gives the same outcome
+    sim.start_flood()
+    for _ in range(rng.randint(0, 10)):
+        sim.step()
+    if sim.flood_active:
+        assert sim.predict().safe == prediction.safe
+
+    assert sim.run_to_completion() == prediction.safe
+    assert prediction.safe == (not any(prediction.zone_wet))
+    if not prediction.safe:
+        # The flood is lost on the tick the first zone gets wet
+        assert sim.flood.tick == min(tick for tick in prediction.first_wet_tick if tick is not None)
+
+@pytest.mark.parametrize('level_number', [1, 2])
+def test_prediction_of_winning_layouts(level_number):
+    level = stt.LEVELS[level_number - 1]
+    solutions = stt.solve_level(level_number, find_all=True, workers=1).solutions
+    for layout in random.Random(level_number).sample(solutions, 10):
+        sim = stt.Simulation(levels=[with_layout(level, layout)])
+        prediction = sim.predict()
+        assert prediction.safe and not any(prediction.zone_wet)
+        assert all(tick is None for tick in prediction.first_wet_tick)
+        assert sim.run_to_completion()
@@ -0,0 +1,76 @@
+''' Recording a session's inputs and replaying them to the same final grid '''
+
+import json
+import random
+
+import pytest
+
+import stem_the_tide as stt
+from support import random_inputs
+
+def record_session(sim, seed, frames=300):
+    """Play random inputs (a flood start, speed changes and barrier moves) over frames of random lengths"""
+    rng = random.Random(seed)
+    recorder = stt.InputRecorder(sim)
+    for frame in range(frames):
+        recorder.begin_frame(rng.choice([8, 16, 17, 33, 250]))
+        if frame == frames // 3:
+            recorder.apply_input('start')
+        elif rng.random() < 0.02:
+            recorder.apply_input('speed', rng.choice([1, -1]))
+        elif rng.random() < 0.3:
+            recorder.apply_input(*random_inputs(rng, sim, 1)[0])
+        sim.update(recorder.frame_ms[-1] / 1000.0)
+    return recorder
+
+@pytest.mark.parametrize('seed', range(4))
+def test_replay_matches_the_recording(tmp_path, seed):
+    sim = stt.Simulation()
+    path = tmp_path / 'session.json'
+    record_session(sim, seed).save(path)
+    replayed, matches = stt.replay_file(path)
+    assert matches
+    assert stt.grid_hash(replayed.grid) == stt.grid_hash(sim.grid)
+    assert replayed.current_level == sim.current_level
+
+def test_replay_is_deterministic(tmp_path):
+    path = tmp_path / 'session.json'
+    record_session(stt.Simulation(), 7).save(path)
+    record = json.loads(path.read_text())
+    assert len({stt.grid_hash(stt.replay(record).grid) for _ in range(3)}) == 1
+
+def test_tampered_recording_does_not_match(tmp_path):
+    path = tmp_path / 'session.json'
+    record_session(stt.Simulation(), 1).save(path)
+    record = json.loads(path.read_text())
+    record['final_hash'] = '0' * len(record['final_hash'])
+    path.write_text(json.dumps(record))
+    assert not stt.replay_file(path)[1]
+
+def test_replay_on_other_levels_is_refused(tmp_path):
+    path = tmp_path / 'session.json'
+    record_session(stt.Simulation(), 1, 20).save(path)
+    with pytest.raises(ValueError):
+        stt.replay_file(path, stt.LEVELS[:2])
+
+def test_levels_hash():
+    assert stt.levels_hash(stt.LEVELS) == stt.levels_hash([dict(level) for level in stt.LEVELS])
+    assert stt.levels_hash(stt.LEVELS) != stt.levels_hash(stt.LEVELS[::-1])
+
+def test_pack_replay_decodes_only_the_levels_played(tmp_path):
+    pack_path = tmp_path / 'levels.pack'
+    stt.write_level_pack(pack_path, stt.LEVELS)
+    path = tmp_path / 'session.json'
+    pack = stt.LevelPack(pack_path)
+    record_session(stt.Simulation(levels=pack), 3).save(path)
+    pack.close()
+
+    pack = stt.LevelPack(pack_path)
+    sim, matches = stt.replay_file(path, pack)
+    assert matches
+    assert sorted(pack.decoded) == list(range(sim.current_level))
+    assert stt.levels_hash(pack) == pack.digest
+    pack.close()
+    # A pack's recordings are tied to the pack file, not to the levels in it
+    with pytest.raises(ValueError):
+        stt.replay_file(path, stt.LEVELS)
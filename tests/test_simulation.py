@@ -0,0 +1,34 @@
+''' The headless Simulation: starting, stepping and finishing a flood '''
+
+import stem_the_tide as stt
+
+def test_run_to_completion_loses_with_starting_layout():
+    sim = stt.Simulation(current_level=1)
+    assert sim.run_to_completion() is False
+    assert sim.game_over and not sim.flood_active
+
+def test_start_flood_after_a_loss_does_nothing():
+    sim = stt.Simulation(current_level=1)
+    sim.run_to_completion()
+    cells = stt.grid_hash(sim.grid)
+    assert sim.start_flood() is False
+    assert not sim.flood_active
+    # Returns instead of looping on a flood that can never step
+    assert sim.run_to_completion() is False
+    assert stt.grid_hash(sim.grid) == cells
+
+def test_start_flood_while_running_keeps_the_flood():
+    sim = stt.Simulation(current_level=1)
+    assert sim.start_flood() is True
+    for _ in range(5):
+        sim.step()
+    flood = sim.flood
+    assert sim.start_flood() is False
+    assert sim.flood is flood and flood.tick == 5
+
+def test_reset_after_a_loss_allows_a_new_flood():
+    sim = stt.Simulation(current_level=1)
+    sim.run_to_completion()
+    sim.apply_input('reset')
+    assert not sim.game_over
+    assert sim.start_flood() is True
@@ -0,0 +1,33 @@
+''' solve_barriers must find exactly the barrier layouts that win '''
+
+import random
+
+import pytest
+
+np = pytest.importorskip('numpy')
+import stem_the_tide as stt
+from support import overlapping, random_layouts, with_layout
+
+@pytest.mark.parametrize('level_number, count', [(1, 41), (2, 117)])
+def test_solutions_win(level_number, count):
+    level = stt.LEVELS[level_number - 1]
+    result = stt.solve_level(level_number, find_all=True, workers=1)
+    assert result.count == count == len(set(result.solutions))
+    assert result.best in result.solutions
+    rng = random.Random(level_number)
+    for layout in rng.sample(result.solutions, 10):
+        assert stt.Simulation(levels=[with_layout(level, layout)]).run_to_completion()
+
+@pytest.mark.parametrize('level_number', [1, 2])
+def test_other_layouts_lose(level_number):
+    level = stt.LEVELS[level_number - 1]
+    grid, barriers, priority_zones, sources, splash_pads = stt.level_problem(level_number)
+    solutions = set(stt.solve_level(level_number, find_all=True, workers=1).solutions)
+    rng = random.Random(level_number)
+    layouts = [layout for layout in random_layouts(rng, grid, barriers, 60) if not overlapping(layout, barriers)]
+    for layout in layouts:
+        won = stt.Simulation(levels=[with_layout(level, layout)]).run_to_completion()
+        assert won == (tuple(map(tuple, layout)) in solutions)
+
+def test_pool_gives_the_same_count():
+    assert stt.solve_level(2, workers=2).count == stt.solve_level(2, workers=1).count
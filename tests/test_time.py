@@ -0,0 +1,47 @@
+''' The flood must run at the same pace whatever the frame rate '''
+
+import pytest
+
+import stem_the_tide as stt
+
+def run_frames(frame, seconds, time_scale=1):
+    """A level 1 flood after seconds of frames frame seconds long; returns the simulation and the ticks applied"""
+    sim = stt.Simulation(flood_speed=0.125)
+    sim.time_scale = time_scale
+    sim.start_flood()
+    ticks = sum(sim.update(frame) for _ in range(round(seconds / frame)))
+    return sim, ticks
+
+def test_ticks_do_not_depend_on_the_frame_rate():
+    # Frame lengths are powers of two so the timer adds up exactly
+    runs = [run_frames(frame, 2) for frame in (1 / 64, 1 / 32, 1 / 8, 1 / 2, 2)]
+    assert [ticks for sim, ticks in runs] == [16] * len(runs)
+    assert len({stt.grid_hash(sim.grid) for sim, ticks in runs}) == 1
+
+def test_leftover_time_carries_over():
+    sim = stt.Simulation(flood_speed=0.125)
+    sim.start_flood()
+    assert [sim.update(0.09375) for _ in range(4)] == [0, 1, 1, 1]
+
+def test_time_scale_multiplies_the_ticks():
+    for time_scale in (2, 5):
+        assert run_frames(1 / 32, 1, time_scale)[1] == 8 * time_scale
+
+def test_instant_runs_the_flood_to_its_end():
+    sim = stt.Simulation()
+    sim.time_scale = stt.INSTANT
+    sim.start_flood()
+    assert sim.update(0) > 0
+    assert not sim.flood_active
+    assert sim.update(1) == 0
+
+def test_no_ticks_without_a_flood():
+    assert stt.Simulation().update(10) == 0
+
+@pytest.mark.parametrize('steps, time_scale', [([1], 2), ([1, 1, 1], 10), ([1] * 9, stt.INSTANT),
+                                                ([-1], 1), ([1, 1, -1], 2)])
+def test_speed_input_steps_through_time_scales(steps, time_scale):
+    sim = stt.Simulation()
+    for step in steps:
+        sim.apply_input('speed', step)
+    assert sim.time_scale == time_scale
@@ -0,0 +1,66 @@
+''' The level validator (python stem_the_tide.py validate DIRECTORY) '''
+
+import json
+
+import pytest
+
+np = pytest.importorskip('numpy')
+import stem_the_tide as stt
+
+LEVEL = stt.LEVELS[0]
+ZONE_X, ZONE_Y, ZONE_SIZE = LEVEL['priority_zones'][0]
+
+def run_validator(directory, capsys):
+    """Exit code and report lines of the validator on a directory"""
+    with pytest.raises(SystemExit) as exit_info:
+        stt.validate_main([str(directory), '-j', '2'])
+    return exit_info.value.code, capsys.readouterr().out.splitlines()
+
+def write_levels(directory, levels):
+    for name, level in levels.items():
+        (directory / name).write_text(level if isinstance(level, str) else json.dumps(level))
+
+def test_good_levels_pass(tmp_path, capsys):
+    write_levels(tmp_path, {'1.json': LEVEL, '2.json': [LEVEL, stt.LEVELS[1]], 'notes.txt': 'not a level'})
+    code, lines = run_validator(tmp_path, capsys)
+    assert code == 0
+    assert [line.split()[:3] for line in lines[1:-1]] == [['1.json', 'ok', '41'], ['2.json[0]', 'ok', '41'],
+                                                          ['2.json[1]', 'ok', '117']]
+    assert lines[-1].startswith("3 levels: 3 ok, 0 failed")
+
+def test_bad_levels_fail_their_row(tmp_path, capsys):
+    write_levels(tmp_path, {
+        'good.json': LEVEL,
+        'short_pad.json': dict(LEVEL, splash_pads=[[1, 2]]),
+        'pad_on_zone.json': dict(LEVEL, splash_pads=[[ZONE_X + 1, ZONE_Y + 1, 2]]),
+        'pad_off_grid.json': dict(LEVEL, splash_pads=[[LEVEL['width'] - 1, 10, 4]]),
+        'barrier_on_zone.json': dict(LEVEL, barriers=[[ZONE_X, ZONE_Y - 2, 3, 4, False]]),
+        'unreadable.json': '{not json',
+    })
+    code, lines = run_validator(tmp_path, capsys)
+    assert code == 1
+    report = '\n'.join(lines)
+    assert lines[-1].startswith("6 levels: 1 ok, 5 failed")
+    for error in ("splash pad 0 [1, 2] is not a list of 3 integers",
+                  f"splash pad 0 {(ZONE_X + 1, ZONE_Y + 1, 2)} covers priority zone 0",
+                  f"splash pad 0 {(LEVEL['width'] - 1, 10, 4)} overlaps the metadata edges",
+                  f"barrier 0 {(ZONE_X, ZONE_Y - 2, 3, 4)} covers priority zone 0", "cannot read"):
+        assert error in report
+
+def test_level_errors():
+    assert stt.level_errors(LEVEL) == []
+    assert stt.level_errors([]) == ["not a level definition"]
+    assert stt.level_errors(dict(LEVEL, width='64')) == ["width and height must be positive integers"]
+    assert stt.level_errors(dict(LEVEL, splash_pads={})) == ["splash_pads must be a list"]
+    assert stt.level_errors(dict(LEVEL, splash_pads=[[20, 20, 0]])) == [
+        "splash pad 0 (20, 20, 0) overlaps the metadata edges"]
+    assert stt.level_errors(dict(LEVEL, barriers=[[ZONE_X - 1, ZONE_Y - 1, 2, 2, True]])) == [
+        f"barrier 0 {(ZONE_X - 1, ZONE_Y - 1, 2, 2)} covers priority zone 0"]
+
+def test_crash_fails_the_level(monkeypatch):
+    def solve_level(level, workers=None):
+        raise RuntimeError("solver broke")
+    monkeypatch.setattr(stt, 'solve_level', solve_level)
+    report = stt.validate_level(('crash.json', LEVEL, 1, 1))
+    assert report.name == 'crash.json'
+    assert report.errors == ["crashed: RuntimeError: solver broke"]
@@ -0,0 +1,41 @@
+''' Drawing a board through a Viewport: zooming and the screen around a board smaller than the window '''
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pygame = pytest.importorskip('pygame')
+import stem_the_tide as stt
+
+@pytest.fixture
+def screen():
+    pygame.display.init()
+    yield pygame.display.set_mode((640, 640))
+    pygame.display.quit()
+
+def draw(screen, sim, viewport):
+    renderer = stt.Renderer(screen, viewport.rect[2], viewport.rect[3], viewport.zoom)
+    renderer.draw(sim.grid.region(*viewport.rect))
+    return renderer
+
+def test_zooming_out_clears_the_screen_around_the_board(screen):
+    sim = stt.Simulation(current_level=1)
+    viewport = stt.Viewport(64, 64, 640, 640)
+    draw(screen, sim, viewport)
+    assert tuple(screen.get_at((500, 10)))[:3] == stt.STATES[6]  # Metadata edge at zoom 10
+
+    viewport.zoom_by(-1)
+    draw(screen, sim, viewport)
+    drawn = 64 * viewport.zoom
+    pixels = pygame.surfarray.pixels3d(screen)
+    assert (pixels[drawn:, :] == stt.STATES[0]).all()
+    assert (pixels[:drawn, drawn:] == stt.STATES[0]).all()
+    assert tuple(pixels[drawn - 1, drawn - 1]) == stt.STATES[6]
+
+def test_zoom_keeps_the_anchor_cell():
+    viewport = stt.Viewport(512, 512, 640, 640)
+    viewport.scroll(200, 200)  # Away from the edges, where the view is clamped
+    cell = viewport.to_grid(300, 200)
+    viewport.zoom_by(1, (300, 200))
+    assert viewport.to_grid(300, 200) == cell
+    viewport.zoom_by(-2, (300, 200))
+    assert viewport.to_grid(300, 200) == cell